@@ -0,0 +1,233 @@
+import json
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from fileio import write_json_atomic
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# 더 이상 결과가 나오지 않는 배치 상태
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJob:
+    """모든 청크를 JSONL 파일로 만들어 Batch API로 제출하고 결과를 모으는 오프라인 작업
+
+    진행 상태는 작업 폴더의 state.json에 단계마다 저장되므로, 중간에 중단되어도
+    다시 실행하면 이미 끝난 단계(업로드, 배치 생성)를 건너뛰고 이어서 진행합니다.
+    """
+
+    def __init__(self, client: "OpenAI", work_dir: str, model: str, temperature: float, system_prompt: str):
+        self.client = client
+        self.work_dir = work_dir
+        self.model = model
+        self.temperature = temperature
+        self.system_prompt = system_prompt
+        self.state_path = os.path.join(work_dir, "state.json")
+        self.input_path = os.path.join(work_dir, "input.jsonl")
+        self.output_path = os.path.join(work_dir, "output.jsonl")
+        self.error_path = os.path.join(work_dir, "errors.jsonl")
+        os.makedirs(work_dir, exist_ok=True)
+        self.state = self.load_state()
+
+    def load_state(self) -> Optional[dict]:
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_state(self):
+        write_json_atomic(self.state_path, self.state)
+
+    def has_pending(self) -> bool:
+        """이어서 진행할 작업이 있는지 확인합니다."""
+        return self.state is not None and self.state["status"] != "saved"
+
+    @staticmethod
+    def custom_id(file_no: int, index: int) -> str:
+        return f"{file_no}-{index}"
+
+    def prepare(self, files: Dict[str, List[str]], cached: Optional[Dict[str, str]] = None):
+        """파일별 청크 목록으로 배치 입력 JSONL을 만듭니다. cached에 있는 청크는 제출하지 않습니다."""
+        cached = cached or {}
+        request_count = 0
+        # 이전 작업의 결과 파일이 새 작업 결과로 섞이지 않도록 삭제
+        for path in (self.output_path, self.error_path):
+            if os.path.exists(path):
+                os.remove(path)
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            for file_no, chunks in enumerate(files.values()):
+                for index, chunk in enumerate(chunks):
+                    custom_id = self.custom_id(file_no, index)
+                    if custom_id in cached:
+                        continue
+                    request = {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {
+                            "model": self.model,
+                            "messages": [
+                                {"role": "system", "content": self.system_prompt},
+                                {"role": "user", "content": chunk}
+                            ],
+                            "temperature": self.temperature
+                        }
+                    }
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+                    request_count += 1
+
+        self.state = {
+            "job_id": uuid.uuid4().hex,
+            "status": "prepared",
+            "files": files,
+            "cached": cached,
+            "request_count": request_count,
+            "input_file_id": None,
+            "batch_id": None,
+            "output_file_id": None,
+            "error_file_id": None
+        }
+        self.save_state()
+
+    def submit(self):
+        """입력 파일을 업로드하고 배치를 생성합니다. 이미 진행된 단계는 건너뜁니다."""
+        if self.state["request_count"] == 0:
+            # 모든 청크가 캐시에 있으면 제출할 것이 없다
+            self.state["status"] = "completed"
+            self.save_state()
+            return
+
+        if self.state["input_file_id"] is None:
+            with open(self.input_path, 'rb') as f:
+                uploaded = self.client.files.create(file=f, purpose="batch")
+            self.state["input_file_id"] = uploaded.id
+            self.save_state()
+
+        if self.state["batch_id"] is None:
+            # 배치 생성 직후 중단된 경우 같은 작업의 배치를 다시 만들지 않도록 metadata로 찾는다
+            batch = self.find_batch()
+            if batch is None:
+                batch = self.client.batches.create(
+                    input_file_id=self.state["input_file_id"],
+                    endpoint="/v1/chat/completions",
+                    completion_window="24h",
+                    metadata={"job_id": self.state["job_id"]}
+                )
+            self.state["batch_id"] = batch.id
+            self.state["status"] = "submitted"
+            self.save_state()
+
+    def find_batch(self):
+        for batch in self.client.batches.list(limit=100):
+            if (batch.metadata or {}).get("job_id") == self.state["job_id"]:
+                return batch
+        return None
+
+    def wait(self, poll_interval: float = 60.0):
+        """배치가 끝날 때까지 상태를 주기적으로 확인하고 결과 파일과 요청별 오류 파일을 내려받습니다.
+
+        결과 없이 실패, 만료, 취소된 배치는 status를 "failed"로 기록하고 RuntimeError를 발생시킵니다.
+        다음 실행에서는 끝난 배치를 다시 확인하지 않고 retry_failed()로 다시 제출합니다."""
+        if self.state["status"] in ("completed", "failed"):
+            return
+        while True:
+            batch = self.client.batches.retrieve(self.state["batch_id"])
+            if batch.status in BATCH_FINAL_STATUSES:
+                break
+            time.sleep(poll_interval)
+
+        self.download(batch.output_file_id, self.output_path)
+        self.download(batch.error_file_id, self.error_path)
+        self.state["output_file_id"] = batch.output_file_id
+        self.state["error_file_id"] = batch.error_file_id
+        self.state["batch_status"] = batch.status
+        if batch.status != "completed" and not batch.output_file_id:
+            self.state["status"] = "failed"
+            self.save_state()
+            errors = getattr(batch, "errors", None)
+            reason = f" ({errors.data[0].message})" if errors and errors.data else ""
+            raise RuntimeError(f"배치 작업이 {batch.status} 상태로 종료되었습니다{reason}. "
+                               f"다시 실행하면 결과를 받지 못한 청크만 새 배치로 제출합니다.")
+        self.state["status"] = "completed"
+        self.save_state()
+
+    def download(self, file_id: Optional[str], path: str):
+        if file_id:
+            content = self.client.files.content(file_id)
+            with open(path, 'wb') as f:
+                f.write(content.read())
+
+    def retry_failed(self) -> int:
+        """결과 없이 끝난 배치의 청크를 새 배치 입력으로 다시 만들고 제출할 청크 수를 반환합니다.
+        이전에 캐시에 있던 청크는 그대로 제출하지 않습니다."""
+        self.prepare(self.state["files"], self.state["cached"])
+        return self.state["request_count"]
+
+    @staticmethod
+    def read_records(path: str) -> Dict[str, dict]:
+        """결과 또는 오류 JSONL 파일을 {custom_id: 레코드}로 읽습니다."""
+        records = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record["custom_id"]] = record
+        return records
+
+    @staticmethod
+    def error_message(record: Optional[dict]) -> str:
+        """요청별 결과 레코드에서 실패 사유를 꺼냅니다."""
+        if record is None:
+            return "결과 없음"
+        error = record.get("error") or ((record.get("response") or {}).get("body") or {}).get("error") or {}
+        status_code = (record.get("response") or {}).get("status_code")
+        return error.get("message") or f"status {status_code}"
+
+    def collect(self) -> Dict[str, dict]:
+        """결과를 파일별로 모읍니다. 실패한 청크는 원문을 유지하고 rejected에 번호를, errors에 {번호: 실패 사유}를 기록합니다."""
+        outputs = self.read_records(self.output_path)
+        # 실패한 요청은 결과 파일이 아닌 오류 파일(error_file_id)에 기록된다
+        failures = self.read_records(self.error_path)
+
+        collected = {}
+        for file_no, (filename, chunks) in enumerate(self.state["files"].items()):
+            texts = []
+            rejected = []
+            errors = {}
+            usage = {"input": 0, "output": 0}
+            for index, chunk in enumerate(chunks):
+                custom_id = self.custom_id(file_no, index)
+                if custom_id in self.state["cached"]:
+                    texts.append(self.state["cached"][custom_id])
+                    continue
+                record = outputs.get(custom_id)
+                response = (record or {}).get("response") or {}
+                if response.get("status_code") != 200:
+                    texts.append(chunk)
+                    rejected.append(index)
+                    errors[index] = self.error_message(record or failures.get(custom_id))
+                    continue
+                body = response["body"]
+                texts.append(body["choices"][0]["message"]["content"].strip())
+                usage["input"] += body["usage"]["prompt_tokens"]
+                usage["output"] += body["usage"]["completion_tokens"]
+            collected[filename] = {"texts": texts, "rejected": rejected, "errors": errors, "usage": usage}
+        return collected
+
+    def mark_saved(self, filename: str, saved_path: str):
+        """파일별 저장 결과를 기록하여 다시 실행해도 같은 파일을 중복 저장하지 않게 합니다."""
+        self.state.setdefault("saved_paths", {})[filename] = saved_path
+        self.save_state()
+
+    def saved_paths(self) -> Dict[str, str]:
+        return self.state.get("saved_paths", {})
+
+    def finish(self):
+        """결과 저장이 끝났음을 기록하여 다음 실행에서 새 작업을 시작하게 합니다."""
+        self.state["status"] = "saved"
+        self.save_state()
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class RefineCache:
+    """정제 결과를 SQLite 파일에 저장하는 내용 주소 기반 캐시 (크기 제한, LRU 삭제)"""
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # isolation_level=None: 저장할 때마다 바로 커밋되어 중단되어도 결과가 남는다
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # WAL 모드에서는 여러 프로세스가 같은 캐시 파일을 동시에 읽고 쓸 수 있다
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS refined ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS refined_last_access ON refined (last_access)")
+
+    @staticmethod
+    def make_key(text: str, model: str, temperature: float, system_prompt: str) -> str:
+        """정제 결과에 영향을 주는 모든 입력으로 캐시 키를 만듭니다."""
+        payload = json.dumps([text, model, temperature, system_prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """캐시된 정제 결과를 반환합니다. 없으면 None을 반환합니다."""
+        with self.lock:
+            row = self.conn.execute("SELECT text FROM refined WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE refined SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, text: str):
+        """정제 결과를 저장하고 최대 크기를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다."""
+        size = len(text.encode('utf-8')) + len(key)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO refined (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time())
+            )
+            self.evict()
+
+    def evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM refined").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, size FROM refined ORDER BY last_access").fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM refined WHERE key = ?", expired)
+
+    def size(self) -> int:
+        """캐시에 저장된 전체 크기(바이트)를 반환합니다."""
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM refined").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
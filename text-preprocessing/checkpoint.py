@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class CheckpointJournal:
+    """완료된 청크의 (번호, 입력 해시, 정제 결과)를 한 줄씩 추가 기록하는 체크포인트 파일
+
+    O_APPEND로 연 파일에 한 줄을 한 번의 write로 기록하므로 여러 작업이나 프로세스가
+    같은 파일에 동시에 기록해도 줄이 섞이지 않습니다. 중단 시점에 잘린 마지막 줄은 읽을 때 무시합니다.
+    메모리에는 이전 실행에서 완료된 청크의 입력 해시와 줄 위치만 두고 정제 결과는 필요할 때 파일에서 읽으며,
+    이번 실행에서 기록한 청크는 파일에만 남기므로 메모리 사용량이 입력 크기에 따라 늘지 않습니다.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.reader = open(path, 'rb')
+        # 잘린 마지막 줄 뒤에 새 줄이 이어 붙지 않도록 줄바꿈을 먼저 쓴다
+        size = os.path.getsize(path)
+        if size:
+            self.reader.seek(size - 1)
+            if self.reader.read(1) != b"\n":
+                os.write(self.fd, b"\n")
+
+    @staticmethod
+    def hash_input(text: str) -> bytes:
+        return hashlib.sha256(text.encode('utf-8')).digest()
+
+    def load(self) -> Dict[int, Tuple[bytes, int, int]]:
+        """청크 번호별 (입력 해시, 줄 시작 위치, 줄 길이)를 읽습니다."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if "output" in entry:
+                        entries[entry["index"]] = (bytes.fromhex(entry["input_hash"]), offset, len(line))
+                except (ValueError, KeyError, TypeError):
+                    pass
+                offset += len(line)
+        return entries
+
+    def get(self, index: int, text: str) -> Optional[str]:
+        """같은 번호, 같은 입력으로 완료된 청크가 있으면 정제 결과를 반환합니다."""
+        entry = self.entries.get(index)
+        if entry is None or entry[0] != self.hash_input(text):
+            return None
+        _, offset, length = entry
+        with self.lock:
+            self.reader.seek(offset)
+            line = self.reader.read(length)
+        return json.loads(line)["output"]
+
+    def record(self, index: int, text: str, output: str):
+        line = json.dumps({"index": index, "input_hash": self.hash_input(text).hex(), "output": output},
+                          ensure_ascii=False) + "\n"
+        with self.lock:
+            os.write(self.fd, line.encode('utf-8'))
+
+    def close(self):
+        self.reader.close()
+        os.close(self.fd)
+
+    def complete(self):
+        """모든 청크가 끝나면 체크포인트 파일을 삭제합니다."""
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import struct
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from metrics import result_source
+from refine_engine import RefineResult
+
+# 색인 파일은 각 청크 줄의 시작 위치(바이트)를 8바이트 정수로 나열한 배열
+OFFSET = struct.Struct('<Q')
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def locate_spans(source: str, chunks: List[str]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """각 청크가 원문에서 차지하는 (시작, 끝) 글자 위치를 찾습니다.
+
+    청크는 문장을 공백 하나로 이어 붙이고 짧은 문장을 빼기도 하므로, 공백을 지운 원문에서
+    청크의 앞부분과 뒷부분을 차례로 찾아 구간을 정합니다. 찾지 못한 청크는 (None, None)입니다.
+    """
+    positions = [i for i, ch in enumerate(source) if not ch.isspace()]
+    compact = "".join(source[i] for i in positions)
+    spans = []
+    cursor = 0
+    for chunk in chunks:
+        body = "".join(chunk.split())
+        head, tail = body[:32], body[-32:]
+        start = compact.find(head, cursor) if body else -1
+        end = compact.find(tail, start + len(body) - len(tail)) if start >= 0 else -1
+        if end < 0:
+            spans.append((None, None))
+            continue
+        cursor = end + len(tail)
+        spans.append((positions[start], positions[cursor - 1] + 1))
+    return spans
+
+
+class ChunkStoreWriter:
+    """청크별 정제 결과를 JSONL 파일에 한 줄씩 쓰고, 줄 시작 위치를 색인 파일에 기록합니다.
+
+    임시 파일에 쓴 뒤 close()에서 교체하므로 중간에 중단되어도 이전 결과 파일이 깨지지 않습니다.
+    """
+
+    def __init__(self, path: str, source_path: str, model: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        self.data = open(path + ".tmp", 'wb')
+        self.index = open(self.index_path + ".tmp", 'wb')
+        self.model = model
+        self.count = 0
+        header = {"source": os.path.basename(source_path), "model": model,
+                  "created": datetime.now().isoformat(timespec="seconds")}
+        if os.path.exists(source_path):
+            digest = hashlib.sha256()
+            with open(source_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            header["source_sha256"] = digest.hexdigest()
+        # 첫 줄은 파일 정보, 색인은 두 번째 줄(청크 0)부터 가리킨다
+        self.data.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def write(self, chunk: str, result: RefineResult, span: Tuple[Optional[int], Optional[int]] = (None, None)):
+        record = {
+            "index": self.count,
+            "start": span[0],
+            "end": span[1],
+            "hash": hash_text(chunk),
+            "refined": result.text,
+            "model": result.model,
+            "tier": result.tier,
+            "origin": result_source(result),
+            "input_tokens": result.input_tokens,
+            "output_tokens": result.output_tokens,
+            "cost": result.cost,
+            "error": result.error
+        }
+        self.index.write(OFFSET.pack(self.data.tell()))
+        self.data.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n")
+        self.count += 1
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.data.close()
+            self.index.close()
+
+
+class ChunkStore:
+    """ChunkStoreWriter로 저장한 결과 파일을 읽습니다. 색인으로 i번째 청크만 바로 읽을 수 있습니다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = open(path, 'rb')
+        self.index = open(os.path.splitext(path)[0] + ".idx", 'rb')
+        self.header = json.loads(self.data.readline())
+
+    def __len__(self) -> int:
+        return os.fstat(self.index.fileno()).st_size // OFFSET.size
+
+    def get(self, i: int) -> dict:
+        """i번째 청크 기록을 반환합니다. 파일 전체를 읽지 않습니다."""
+        if not 0 <= i < len(self):
+            raise IndexError(f"청크 번호가 범위를 벗어났습니다: {i} (전체 {len(self)}개)")
+        self.index.seek(i * OFFSET.size)
+        offset, = OFFSET.unpack(self.index.read(OFFSET.size))
+        self.data.seek(offset)
+        return json.loads(self.data.readline())
+
+    def __iter__(self) -> Iterator[dict]:
+        self.data.seek(0)
+        self.data.readline()
+        for line in self.data:
+            yield json.loads(line)
+
+    def export_text(self, separator: str = "\n    ") -> str:
+        """정제 결과를 이어 붙인 텍스트 (기존 txt 출력 형식)"""
+        return separator.join(record["refined"] for record in self)
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
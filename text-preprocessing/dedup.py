@@ -0,0 +1,169 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from evaluation import content_words
+
+# 2^61 - 1 (메르센 소수), MinHash 순열 계산에 사용
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+WORD = re.compile(r'\w+')
+
+
+def base_hash(value: str) -> int:
+    """프로세스가 달라도 같은 값을 주는 32비트 해시 (파이썬 hash()는 실행마다 달라진다)"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+class MinHasher:
+    """단어 n-gram(shingle) 집합의 MinHash 서명을 계산합니다."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.shingle_size = shingle_size
+        generator = random.Random(seed)
+        self.permutations = [(generator.randrange(1, MERSENNE_PRIME), generator.randrange(0, MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+
+    def shingles(self, text: str) -> Set[str]:
+        words = WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        hashes = [base_hash(shingle) for shingle in shingles]
+        if not hashes:
+            return [MAX_HASH] * len(self.permutations)
+        return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in self.permutations]
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def differing_words(a: str, b: str) -> Set[str]:
+    """두 청크 중 한쪽에만 있는(또는 더 많이 나온) 단어"""
+    left = Counter(WORD.findall(a.lower()))
+    right = Counter(WORD.findall(b.lower()))
+    return set((left - right) + (right - left))
+
+
+def trivial_difference(a: str, b: str) -> bool:
+    """두 청크의 차이가 기능어와 간투사뿐인지 확인합니다.
+    숫자나 내용어가 하나라도 다르면 ("two goals" / "six goals") 정제 결과를 재사용하면 안 된다."""
+    words = differing_words(a, b)
+    return not any(ch.isdigit() for word in words for ch in word) and not content_words(" ".join(words))
+
+
+def band_buckets(signature: List[int], bands: int) -> List[int]:
+    """서명을 bands개 구간으로 나눈 각 구간의 버킷 번호 (SQLite INTEGER에 들어가도록 63비트)"""
+    rows = len(signature) // bands
+    buckets = []
+    for band in range(bands):
+        data = ",".join(map(str, signature[band * rows:(band + 1) * rows])).encode()
+        buckets.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little') >> 1)
+    return buckets
+
+
+class LSHIndex:
+    """한 번의 실행 안에서 서로 거의 같은 청크를 찾는 메모리 MinHash LSH 색인"""
+
+    def __init__(self, hasher: MinHasher, bands: int = 8, threshold: float = 0.9):
+        self.hasher = hasher
+        self.bands = bands
+        self.threshold = threshold
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        self.shingles: Dict[int, Set[str]] = {}
+        self.texts: Dict[int, str] = {}
+
+    def query(self, text: str) -> Optional[Tuple[int, float]]:
+        """유사도가 threshold 이상이고 다른 단어가 기능어와 간투사뿐인 가장 비슷한 항목의 (번호, 유사도)를 반환합니다."""
+        shingles = self.hasher.shingles(text)
+        candidates = set()
+        for band, bucket in enumerate(band_buckets(self.hasher.signature(shingles), self.bands)):
+            candidates.update(self.buckets.get((band, bucket), ()))
+        best = None
+        for key in candidates:
+            similarity = jaccard(shingles, self.shingles[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]) \
+                    and trivial_difference(text, self.texts[key]):
+                best = (key, similarity)
+        return best
+
+    def add(self, key: int, text: str):
+        shingles = self.hasher.shingles(text)
+        self.shingles[key] = shingles
+        self.texts[key] = text
+        for band, bucket in enumerate(band_buckets(self.hasher.signature(shingles), self.bands)):
+            self.buckets.setdefault((band, bucket), []).append(key)
+
+
+class DedupIndex:
+    """이전에 정제한 청크를 SQLite 파일에 MinHash LSH로 색인해 거의 같은 청크의 정제 결과를 찾습니다.
+
+    정제 결과는 모델, temperature, 시스템 프롬프트에 따라 달라지므로 같은 설정(context)으로
+    정제한 청크끼리만 비교합니다. 후보는 LSH 버킷으로 찾고, 단어 3-gram의 Jaccard 유사도로 확인합니다.
+    유사도가 높아도 숫자나 내용어가 다른 청크는 재사용하지 않습니다. (다른 청크의 숫자, 이름이 섞여 들어가지 않도록)
+    """
+
+    def __init__(self, path: str, context: str, threshold: float = 0.9, num_perm: int = 64, bands: int = 8):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.context = context
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY,"
+            " context TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " refined TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket INTEGER, chunk_id INTEGER)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (band, bucket)")
+
+    def local_index(self) -> LSHIndex:
+        """같은 설정으로 한 번의 실행 안에서 쓰는 메모리 색인을 만듭니다."""
+        return LSHIndex(self.hasher, self.bands, self.threshold)
+
+    def find(self, text: str) -> Optional[Tuple[str, float]]:
+        """유사도가 threshold 이상이고 차이가 기능어와 간투사뿐인 청크가 있으면 (정제 결과, 유사도)를 반환합니다."""
+        shingles = self.hasher.shingles(text)
+        buckets = band_buckets(self.hasher.signature(shingles), self.bands)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT chunks.text, chunks.refined FROM bands JOIN chunks ON chunks.id = bands.chunk_id"
+                " WHERE chunks.context = ? AND (" + " OR ".join(["(band = ? AND bucket = ?)"] * self.bands) + ")",
+                [self.context] + [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+            ).fetchall()
+        best = None
+        for candidate, refined in rows:
+            similarity = jaccard(shingles, self.hasher.shingles(candidate))
+            if similarity >= self.threshold and (best is None or similarity > best[1]) \
+                    and trivial_difference(text, candidate):
+                best = (refined, similarity)
+        return best
+
+    def add(self, text: str, refined: str):
+        buckets = band_buckets(self.hasher.signature(self.hasher.shingles(text)), self.bands)
+        with self.lock:
+            # 청크와 버킷을 한 트랜잭션으로 기록
+            self.conn.execute("BEGIN")
+            cursor = self.conn.execute("INSERT INTO chunks (context, text, refined) VALUES (?, ?, ?)",
+                                       (self.context, text, refined))
+            self.conn.executemany("INSERT INTO bands (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                                  [(band, bucket, cursor.lastrowid) for band, bucket in enumerate(buckets)])
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Iterable, List, Optional, Set
+
+WORD = re.compile(r'\w+')
+
+# 내용어에서 빼는 기능어와 간투사 (지워져도 내용이 줄지 않는 단어)
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "so", "to", "of", "in", "on", "at", "by", "for", "with", "from",
+    "as", "is", "are", "was", "were", "be", "been", "being", "am", "do", "does", "did", "have", "has", "had",
+    "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them", "my", "your", "our", "their",
+    "its", "this", "that", "these", "those", "there", "here", "what", "which", "who", "whom", "not", "no",
+    "can", "could", "will", "would", "should", "may", "might", "must", "just", "very", "really", "also", "then",
+    "than", "too", "about", "into", "over", "up", "down", "out", "all", "some", "any", "s", "t", "ll", "re", "ve",
+    "d", "m", "um", "uh", "er", "ah", "hmm", "like", "okay", "ok", "well", "yeah", "actually", "basically",
+    "literally", "kind", "sort", "know", "mean", "right", "now", "let", "go", "going", "get", "got",
+    "음", "어", "아", "에", "그", "저", "뭐", "이제", "그냥", "좀", "막", "약간", "사실", "그러니까", "뭐랄까", "네", "자"
+}
+
+# 평가에 쓰는 기본 설정 조합 (이름: Config 변경 값)
+DEFAULT_CONFIGS = {
+    "기본": {},
+    "짧은 청크": {"MAX_SENTENCE_LENGTH": 300},
+    "긴 청크": {"MAX_SENTENCE_LENGTH": 1200},
+    "temperature 0": {"OPENAI_TEMPERATURE": 0.0},
+    "라우팅 사용": {"ROUTING_ENABLED": True},
+    "사전 정제 끔": {"PREFILTER_ENABLED": False},
+    "로컬 처리 허용": {"PREFILTER_SKIP_API": True},
+}
+
+
+def content_words(text: str) -> List[str]:
+    """기능어, 간투사, 한 글자 영문을 뺀 내용어 목록"""
+    return [word for word in WORD.findall(text.lower())
+            if word not in STOPWORDS and not (len(word) == 1 and word.isascii())]
+
+
+def corpus_keywords(texts: Iterable[str], min_count: int = 3) -> Set[str]:
+    """말뭉치 전체에서 min_count번 이상 나온 내용어와 숫자가 들어간 단어 (강의의 핵심 용어)"""
+    counts = Counter(word for text in texts for word in content_words(text))
+    return {word for word, count in counts.items() if count >= min_count or any(ch.isdigit() for ch in word)}
+
+
+def edit_distance(source: List[str], target: List[str]) -> int:
+    """단어 단위 레벤슈타인 거리"""
+    if len(source) < len(target):
+        source, target = target, source
+    previous = list(range(len(target) + 1))
+    for i, word in enumerate(source, 1):
+        current = [i]
+        for j, other in enumerate(target, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1]
+
+
+def evaluate_chunks(originals: List[str], refined: List[str], keywords: Set[str]) -> dict:
+    """원문 청크와 정제 결과를 비교한 품질 지표를 계산합니다.
+
+    - retention: 원문 내용어 중 정제 결과에 남은 비율 (청크 평균, 최솟값)
+    - compression: 정제 결과 글자 수 / 원문 글자 수 (전체)
+    - edit_distance: 단어 단위 편집 거리 / 원문 단어 수 (청크 평균)
+    - dropped_keywords: 원문에 있던 핵심 용어가 정제 결과에서 사라진 횟수와 자주 사라진 용어
+    """
+    retentions = []
+    distances = []
+    dropped = Counter()
+    for original, text in zip(originals, refined):
+        original_words = content_words(original)
+        refined_words = content_words(text)
+        if original_words:
+            kept = Counter(original_words) & Counter(refined_words)
+            retentions.append(sum(kept.values()) / len(original_words))
+        words = WORD.findall(original.lower())
+        if words:
+            distances.append(edit_distance(words, WORD.findall(text.lower())) / len(words))
+        dropped.update((set(original_words) & keywords) - set(refined_words))
+
+    original_chars = sum(len(text) for text in originals)
+    return {
+        "chunks": len(originals),
+        "retention": sum(retentions) / len(retentions) if retentions else 1.0,
+        "retention_min": min(retentions) if retentions else 1.0,
+        "compression": sum(len(text) for text in refined) / original_chars if original_chars else 1.0,
+        "edit_distance": sum(distances) / len(distances) if distances else 0.0,
+        "dropped_keywords": sum(dropped.values()),
+        "top_dropped": [word for word, _ in dropped.most_common(5)]
+    }
+
+
+def run_config(name: str, overrides: dict, text: str, source: str, keywords: Set[str],
+               base: Optional[dict] = None) -> dict:
+    """Config를 바꿔 한 말뭉치를 분리, 정제하고 비용, 지연 시간, 품질 지표를 반환합니다.
+    base는 모든 설정에 공통으로 적용할 Config 변경 값입니다."""
+    from main import Config, TextProcessor, get_splitter
+
+    # 이전 실행의 결과를 재사용하지 않도록 캐시, 유사 청크, 체크포인트, 증분 처리는 끈다
+    settings = {"CACHE_ENABLED": False, "DEDUP_ENABLED": False, "CHECKPOINT_ENABLED": False,
+                "INCREMENTAL_ENABLED": False, **(base or {}), **overrides}
+    previous = {key: getattr(Config, key) for key in settings}
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    try:
+        chunks = get_splitter().split_sentences(text)
+        processor = TextProcessor()
+        start = time.perf_counter()
+        results = processor.process_sentences(chunks, source=source)
+        elapsed = time.perf_counter() - start
+    finally:
+        for key, value in previous.items():
+            setattr(Config, key, value)
+
+    summary = processor.metrics.summarize(processor.metrics.records)
+    quality = evaluate_chunks(chunks, [result.text for result in results], keywords)
+    return {
+        "config": name,
+        "overrides": overrides,
+        "requests": summary["sources"]["api"],
+        "rejected": summary["rejected"],
+        "cost_usd": summary["cost_usd"],
+        "elapsed": elapsed,
+        "latency_p50": summary["latency"]["p50"],
+        **quality
+    }
+
+
+def print_table(rows: List[dict]):
+    print(f"\n{'설정':<16} {'청크':>5} {'요청':>5} {'비용($)':>9} {'시간(초)':>8} {'p50(초)':>8} "
+          f"{'보존율':>7} {'최소':>6} {'압축률':>7} {'편집거리':>8} {'누락 용어':>8}")
+    for row in rows:
+        print(f"{row['config']:<16} {row['chunks']:>5} {row['requests']:>5} {row['cost_usd']:>9.4f} "
+              f"{row['elapsed']:>8.2f} {row['latency_p50']:>8.2f} {row['retention']:>7.3f} "
+              f"{row['retention_min']:>6.2f} {row['compression']:>7.3f} {row['edit_distance']:>8.3f} {row['dropped_keywords']:>8}"
+              + (f"  ({', '.join(row['top_dropped'])})" if row["top_dropped"] else ""))
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="설정별 정제 품질과 비용 비교")
+    parser.add_argument("corpus", nargs="?", default="assets/lecture1.txt", help="평가할 txt 파일")
+    parser.add_argument("--configs", default=None,
+                        help="{설정 이름: Config 변경 값} 형식의 JSON 파일 (기본값: 청크 길이, temperature, 라우팅, 사전 정제 비교)")
+    parser.add_argument("--segmenter", default=None, help="모든 설정에 사용할 문장 분리기 (punkt, regex)")
+    parser.add_argument("--keyword-min-count", type=int, default=3, help="핵심 용어로 볼 최소 등장 횟수")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일")
+    args = parser.parse_args(argv)
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        text = f.read()
+    # 핵심 용어는 설정과 관계없이 원문 전체에서 한 번만 뽑아 모든 설정에 같은 기준을 쓴다
+    keywords = corpus_keywords([text], args.keyword_min_count)
+    print(f"{os.path.basename(args.corpus)}: 핵심 용어 {len(keywords)}개, 설정 {len(configs)}개")
+
+    base = {"SEGMENTER": args.segmenter} if args.segmenter else {}
+    # 첫 설정의 처리 시간에 API 클라이언트 import 시간이 섞이지 않도록 미리 불러온다
+    import openai  # noqa: F401
+    rows = []
+    for name, overrides in configs.items():
+        rows.append(run_config(name, overrides, text, os.path.basename(args.corpus), keywords, base))
+        print(f"  {name}: 청크 {rows[-1]['chunks']}개, 요청 {rows[-1]['requests']}개, {rows[-1]['elapsed']:.2f}초")
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n결과를 저장했습니다: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
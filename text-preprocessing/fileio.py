@@ -0,0 +1,10 @@
+import json
+import os
+
+
+def write_json_atomic(path: str, data) -> None:
+    """임시 파일에 쓴 뒤 교체하여 저장 도중 중단되어도 기존 파일이 깨지지 않게 합니다."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,63 @@
+import difflib
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fileio import write_json_atomic
+
+
+class RunManifest:
+    """파일별로 지난 실행의 청크 해시와 정제 결과를 저장해, 수정된 전사 파일에서 바뀐 청크만 다시 정제하게 합니다.
+
+    새 청크 목록을 지난 실행의 청크 목록과 해시 단위로 정렬(diff)해서, 바뀌지 않은 구간의 청크는
+    지난 정제 결과를 그대로 이어 붙이고 바뀌거나 새로 생긴 청크만 요청합니다.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.entries = self.load()
+
+    @staticmethod
+    def hash_chunk(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def load(self) -> List[Tuple[str, Optional[str]]]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return [(entry["hash"], entry["refined"]) for entry in json.load(f)["chunks"]]
+        except (ValueError, KeyError, TypeError):
+            return []
+
+    def align(self, chunks: List[str]) -> Tuple[Dict[int, str], dict]:
+        """바뀌지 않은 청크의 {번호: 지난 정제 결과}와 (유지, 변경, 추가, 삭제) 청크 수를 반환합니다."""
+        old_hashes = [chunk_hash for chunk_hash, _ in self.entries]
+        new_hashes = [self.hash_chunk(chunk) for chunk in chunks]
+        reused = {}
+        stats = {"unchanged": 0, "changed": 0, "inserted": 0, "deleted": 0}
+        matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == "equal":
+                for offset in range(new_end - new_start):
+                    refined = self.entries[old_start + offset][1]
+                    # 지난 실행에서 처리하지 못한 청크는 다시 요청
+                    if refined is not None:
+                        reused[new_start + offset] = refined
+                stats["unchanged"] += new_end - new_start
+            elif tag == "replace":
+                stats["changed"] += new_end - new_start
+                stats["deleted"] += max((old_end - old_start) - (new_end - new_start), 0)
+            elif tag == "insert":
+                stats["inserted"] += new_end - new_start
+            elif tag == "delete":
+                stats["deleted"] += old_end - old_start
+        return reused, stats
+
+    def save(self, chunks: List[str], refined: List[Optional[str]]):
+        """이번 실행의 청크와 정제 결과를 저장합니다. 처리하지 못한 청크는 None으로 기록합니다."""
+        self.entries = [(self.hash_chunk(chunk), text) for chunk, text in zip(chunks, refined)]
+        write_json_atomic(self.path, {"chunks": [{"hash": chunk_hash, "refined": text}
+                                                 for chunk_hash, text in self.entries]})
@@ -0,0 +1,79 @@
+import sys
+import time
+from typing import Dict, Optional, TextIO
+
+from refine_engine import RefineResult
+
+
+class LiveView:
+    """정제된 청크를 입력 순서대로 바로 화면에 보여줍니다.
+
+    여러 청크를 동시에 요청하므로, 순서상 가장 앞의 미완료 청크만 받는 대로 조각을 출력하고
+    뒤쪽 청크의 조각은 모아 두었다가 앞 청크가 끝나면 이어서 출력합니다.
+    on_token과 on_result는 모두 이벤트 루프 스레드에서 호출됩니다.
+    """
+
+    def __init__(self, total: int, out: Optional[TextIO] = None):
+        self.total = total
+        self.out = out or sys.stdout
+        self.next = 0
+        self.partial: Dict[int, str] = {}
+        self.done: Dict[int, RefineResult] = {}
+        # 현재 청크에서 이미 출력한 내용
+        self.shown: Optional[str] = None
+        self.start = time.perf_counter()
+        self.first_output: Optional[float] = None
+
+    def write(self, text: str):
+        if self.first_output is None and text.strip():
+            self.first_output = time.perf_counter() - self.start
+        self.out.write(text)
+        self.out.flush()
+
+    def begin(self):
+        """현재 청크의 머리글을 출력합니다."""
+        self.out.write(f"\n[{self.next + 1}/{self.total}] ")
+        self.shown = ""
+
+    def on_token(self, index: int, piece: Optional[str]):
+        if piece is None:
+            # 재시도로 처음부터 다시 받으므로 출력한 조각은 버린다
+            if index == self.next and self.shown:
+                self.out.write(" …(재시도)")
+                self.begin()
+            self.partial[index] = ""
+            return
+        self.partial[index] = self.partial.get(index, "") + piece
+        if index == self.next:
+            self.flush_partial()
+
+    def flush_partial(self):
+        text = self.partial.get(self.next, "").lstrip()
+        if not text:
+            return
+        if self.shown is None:
+            self.begin()
+        self.write(text[len(self.shown):])
+        self.shown = text
+
+    def on_result(self, result: RefineResult):
+        self.done[result.index] = result
+        while self.next in self.done:
+            result = self.done.pop(self.next)
+            self.partial.pop(self.next, None)
+            if self.shown is None:
+                self.begin()
+            if result.rejected:
+                prefix = "\n" if self.shown else ""
+                self.write(f"{prefix}{result.text}  (처리하지 못해 원문 유지: {result.error})")
+            elif result.text.startswith(self.shown):
+                self.write(result.text[len(self.shown):])
+            else:
+                # 스트리밍으로 받은 내용과 최종 결과가 다르면 최종 결과로 다시 출력
+                self.write(f"\n{result.text}")
+            self.next += 1
+            self.shown = None
+            self.flush_partial()
+        if self.next == self.total:
+            self.out.write("\n")
+            self.out.flush()
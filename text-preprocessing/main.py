@@ -1,14 +1,35 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import nltk
+import sys
+import glob
+import time
+import asyncio
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Tuple
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 import json
-from tqdm import tqdm
+from refine_engine import AsyncRefineEngine, RefineResult, TokenCallback
+from scheduler import RateLimiter, RequestRejectedError, RequestScheduler
+from cache import RefineCache
+from tokenizer import TokenCounter, estimate_tokens
+from batch_job import BatchJob
+from pipeline import read_blocks, stream_chunks, stream_sentences
+from checkpoint import CheckpointJournal
+from segmenter import available_segmenter, get_segmenter, trailing_context
+from prefilter import FillerFilter
+from metrics import MetricsRecorder
+from dedup import DedupIndex
+from incremental import RunManifest
+from chunk_store import ChunkStore, ChunkStoreWriter, locate_spans
+from live_view import LiveView
+from router import ModelRouter, Route
 
-# .env 파일에서 환경 변수 로드
-load_dotenv()
+if TYPE_CHECKING:
+    # openai, tqdm, dotenv는 불러오는 데 오래 걸리므로 실제로 쓰는 함수 안에서 가져온다
+    from openai import AsyncOpenAI
 
 class Config:
     # 파일 경로 설정
@@ -19,89 +40,515 @@ class Config:
     MIN_SENTENCE_LENGTH = 5
     MAX_SENTENCE_LENGTH = 600
     
+    # 문장 분리기 설정 ("punkt": NLTK Punkt 모델, "regex": 전사문용 규칙 기반 분리기)
+    SEGMENTER = "punkt"
+    # Punkt 자료 디렉토리 (segmenter.py --download로 미리 받아 둠. 없으면 내려받지 않고 regex 사용)
+    NLTK_DATA_DIR = "text-preprocessing/nltk_data"
+    
+    # 문장 병합 방식 설정 ("chars": 글자 수 기준, "tokens": 토큰 수 기준, "stable": 문장 내용으로 경계 결정)
+    # 자주 고쳐서 다시 처리하는 파일은 "stable"로 바꾸면 증분 처리에서 수정한 곳 뒤의 청크 경계가 밀리지 않음
+    PACKING_MODE = "chars"
+    MAX_CHUNK_TOKENS = 400
+    STABLE_ANCHOR_PERIOD = 4
+    
     # OpenAI API 설정
     OPENAI_MODEL = "gpt-3.5-turbo"
+    # None이면 OPENAI_BASE_URL 환경 변수, 그것도 없으면 https://api.openai.com/v1
+    OPENAI_BASE_URL = None
     OPENAI_TEMPERATURE = 0.3
     OPENAI_MAX_TOKENS = 500
+    SYSTEM_PROMPT = "You are an AI assistant that refines lecture content. Remove unnecessary interjections and filler words while preserving the core educational content. Keep the lecture's main points and explanations intact."
+    
+    # 로컬 사전 정제 설정 (API 호출 전에 간투사와 반복을 지움)
+    PREFILTER_ENABLED = True
+    # 사전 정제 후 구어 표현이 남지 않은 청크는 API를 호출하지 않고 로컬 결과를 사용 (기본값: 모든 청크를 모델로 정제)
+    PREFILTER_SKIP_API = False
+    PREFILTER_MAX_MARKER_DENSITY = 0.0
+    
+    # 모델 라우팅 설정 (청크의 구어 표현 점수가 max_score 이하인 첫 단계의 모델로 정제, None은 나머지 전부)
+    # 기본값은 사용하지 않음 (모든 청크를 OPENAI_MODEL로 정제), 켜면 싼 모델과 더 강한 모델로 나눠 보냄
+    ROUTING_ENABLED = False
+    MODEL_TIERS = {
+        "small": {"model": "gpt-4o-mini", "max_score": 0.05},
+        "large": {"model": "gpt-4o", "max_score": None}
+    }
+    ROUTING_SHORT_CHUNK_WORDS = 20
+    
+    # 앞 청크 문맥 설정 (앞 청크 원문의 마지막 문장을 정제하지 않는 참고 문맥으로 함께 보냄, 0이면 사용 안 함)
+    CONTEXT_SENTENCES = 0
+    CONTEXT_MAX_CHARS = 200
+    
+    # 비동기 처리 설정
+    MAX_CONCURRENT_REQUESTS = 8
+    REQUEST_TIMEOUT = 60.0
+    
+    # 배치 요청 설정 (한 번의 요청에 여러 청크를 묶어 보냄, 1이면 사용 안 함)
+    BATCH_SIZE = 1
+    BATCH_MAX_TOKENS = 2000
+    
+    # 요청 스케줄링 설정 (계정의 사용 한도에 맞게 조정)
+    REQUESTS_PER_MINUTE = 3500
+    TOKENS_PER_MINUTE = 200000
+    MAX_RETRIES = 5
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 60.0
+    
+    # 스트리밍 처리 설정 (메모리 사용량이 입력 크기와 관계없이 일정)
+    STREAM_BLOCK_SIZE = 64 * 1024
+    STREAM_PACK_WINDOW = 64
+    STREAM_IN_FLIGHT = 16
+    
+    # 정제 결과 캐시 설정
+    CACHE_ENABLED = True
+    CACHE_PATH = "text-preprocessing/data/cache.sqlite3"
+    CACHE_MAX_BYTES = 100 * 1024 * 1024
+    
+    # 유사 청크 재사용 설정 (거의 같은 청크는 이전 정제 결과를 사용, 숫자나 내용어가 다르면 재사용하지 않음)
+    DEDUP_ENABLED = False
+    DEDUP_PATH = "text-preprocessing/data/dedup.sqlite3"
+    DEDUP_THRESHOLD = 0.9
+    
+    # 체크포인트 설정 (중단된 AI 전처리를 이어서 진행)
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_DIR = "text-preprocessing/data/checkpoints"
+    
+    # 증분 처리 설정 (수정된 전사 파일에서 바뀐 청크만 다시 정제)
+    INCREMENTAL_ENABLED = True
+    INCREMENTAL_DIR = "text-preprocessing/data/incremental"
+    
+    # 오프라인 배치 작업 설정
+    BATCH_JOB_DIR = "text-preprocessing/data/batch_job"
+    BATCH_JOB_POLL_INTERVAL = 60.0
+    BATCH_JOB_DISCOUNT = 0.5
+    
+    # 공유 정제 서비스 설정 (--serve로 실행, 같은 호스트의 여러 사용자가 클라이언트, 한도, 캐시를 공유)
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8780
+    SERVICE_JOB_RETENTION = 3600.0
+    SERVICE_THROUGHPUT_WINDOW = 60.0
+    # --service로 제출한 파일마다 결과를 기다리는 최대 시간 (초, None이면 제한 없음)
+    SERVICE_WAIT_TIMEOUT = 3600.0
     
-    # 토큰 비용 설정 (1M 토큰당)
+    # 요청별 지표 저장 경로 (.json이면 JSON, 그 외에는 Prometheus 텍스트 형식, None이면 저장 안 함)
+    METRICS_PATH = None
+    
+    # 토큰 비용 설정 (모델별, 1M 토큰당)
     TOKEN_COSTS = {
         "gpt-3.5-turbo": {
             "input": 0.50,
             "output": 1.50
+        },
+        "gpt-4o-mini": {
+            "input": 0.15,
+            "output": 0.60
+        },
+        "gpt-4o": {
+            "input": 2.50,
+            "output": 10.00
         }
     }
     
     # 환율 설정
     EXCHANGE_RATE = 1468.30
 
+@lru_cache(maxsize=None)
+def load_env():
+    """.env 파일의 환경 변수를 처음 필요할 때 한 번만 불러옵니다."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def api_base_url() -> str:
+    load_env()
+    return Config.OPENAI_BASE_URL or os.getenv('OPENAI_BASE_URL', "https://api.openai.com/v1")
+
 class TextProcessor:
     def __init__(self):
-        self.client = OpenAI(
-            api_key=os.getenv('OPENAI_API_KEY'),
-            base_url="https://api.openai.com/v1"
-        )
         self.token_costs = Config.TOKEN_COSTS
         self.total_tokens = {"input": 0, "output": 0}
         self.EXCHANGE_RATE = Config.EXCHANGE_RATE
+        # 실행이 여러 번이어도 분당 한도는 이어서 계산
+        self.rate_limiter = RateLimiter(Config.REQUESTS_PER_MINUTE, Config.TOKENS_PER_MINUTE)
+        self.scheduler = RequestScheduler(
+            self.rate_limiter,
+            max_retries=Config.MAX_RETRIES,
+            base_delay=Config.RETRY_BASE_DELAY,
+            max_delay=Config.RETRY_MAX_DELAY,
+            timeout=Config.REQUEST_TIMEOUT
+        )
+        self.cache = RefineCache(Config.CACHE_PATH, Config.CACHE_MAX_BYTES) if Config.CACHE_ENABLED else None
+        self.prefilter = FillerFilter(Config.PREFILTER_MAX_MARKER_DENSITY) if Config.PREFILTER_ENABLED else None
+        tiers = Config.MODEL_TIERS if Config.ROUTING_ENABLED else {"default": {"model": Config.OPENAI_MODEL}}
+        self.router = ModelRouter(tiers, self.prefilter, Config.ROUTING_SHORT_CHUNK_WORDS, Config.PREFILTER_SKIP_API)
+        for model in self.router.models:
+            if model not in self.token_costs:
+                raise ValueError(f"TOKEN_COSTS에 {model} 모델의 비용이 없습니다")
+        self.metrics = MetricsRecorder(self.EXCHANGE_RATE)
+        self.dedup = None
+        if Config.DEDUP_ENABLED:
+            context = RefineCache.make_key("", Config.OPENAI_MODEL, Config.OPENAI_TEMPERATURE, Config.SYSTEM_PROMPT)
+            self.dedup = DedupIndex(Config.DEDUP_PATH, context, Config.DEDUP_THRESHOLD)
+        self.dedup_savings = {"chunks": 0, "tokens": 0, "cost": 0.0}
         
+    def cache_key(self, sentence: str, model: Optional[str] = None, context: Optional[str] = None) -> str:
+        # 참고 문맥이 다르면 정제 결과도 달라질 수 있으므로 키에 포함
+        text = f"{context}\n{sentence}" if context else sentence
+        return RefineCache.make_key(text, model or Config.OPENAI_MODEL, Config.OPENAI_TEMPERATURE, Config.SYSTEM_PROMPT)
+    
+    def routing_summary(self) -> Optional[str]:
+        """라우팅을 사용하면 단계별로 쓰는 모델을 설명하는 문장을 반환합니다."""
+        if not Config.ROUTING_ENABLED:
+            return None
+        tiers = []
+        for name, tier in self.router.tiers:
+            limit = "나머지" if tier.get("max_score") is None else f"점수 {tier['max_score']} 이하"
+            tiers.append(f"{name} → {tier['model']} ({limit})")
+        return f"모델 라우팅 사용 (OPENAI_MODEL 대신 단계별 모델로 정제): {', '.join(tiers)}"
+    
+    @staticmethod
+    def chunk_context(previous: Optional[str]) -> Optional[str]:
+        """앞 청크 원문에서 참고 문맥으로 보낼 마지막 문장을 고릅니다."""
+        if not previous or Config.CONTEXT_SENTENCES <= 0:
+            return None
+        return trailing_context(previous, Config.CONTEXT_SENTENCES, Config.CONTEXT_MAX_CHARS) or None
+    
+    def reuse_duplicate(self, index: int, sentence: str, refined: str, route: Route) -> RefineResult:
+        """거의 같은 청크의 정제 결과를 재사용하고, 요청했다면 들었을 토큰과 비용을 절약분으로 기록합니다."""
+        input_tokens = estimate_tokens(Config.SYSTEM_PROMPT + sentence)
+        output_tokens = estimate_tokens(refined)
+        self.dedup_savings["chunks"] += 1
+        self.dedup_savings["tokens"] += input_tokens + output_tokens
+        self.dedup_savings["cost"] += self.calculate_chunk_cost(input_tokens, output_tokens, route.model)
+        return RefineResult(index, refined, deduplicated=True, tier=route.tier)
+    
     def process_sentence(self, sentence: str) -> Tuple[str, float]:
-        """AI를 사용하여 문장을 정제합니다."""
+        """AI를 사용하여 문장을 정제하고 (정제 결과, 이 요청의 비용)을 반환합니다.
+        재시도 후에도 실패하면 RequestRejectedError를 발생시킵니다."""
+        result = self.process_sentences([sentence])[0]
+        if result.rejected:
+            raise RequestRejectedError(result.error, result.attempts)
+        return result.text, result.cost
+    
+    def process_sentences(self, sentences: List[str],
+                          on_result: Optional[Callable[[RefineResult], None]] = None,
+                          journal: Optional[CheckpointJournal] = None,
+                          source: str = "-") -> List[RefineResult]:
+        """여러 문장을 동시에 정제하고 입력 순서대로 결과를 반환합니다."""
+        return asyncio.run(self.process_sentences_async(sentences, on_result, journal=journal, source=source))
+    
+    def refine_file(self, source_path: str, sentences: List[str],
+                    on_result: Optional[Callable[[RefineResult], None]] = None,
+                    on_token: Optional[TokenCallback] = None) -> Tuple[List[RefineResult], Optional[dict]]:
+        """한 파일의 청크를 체크포인트와 지난 실행 결과를 이용해 정제합니다."""
+        return asyncio.run(self.refine_file_async(source_path, sentences, on_result, on_token=on_token))
+    
+    async def refine_file_async(self, source_path: str, sentences: List[str],
+                                on_result: Optional[Callable[[RefineResult], None]] = None,
+                                engine: Optional[AsyncRefineEngine] = None,
+                                on_token: Optional[TokenCallback] = None) -> Tuple[List[RefineResult], Optional[dict]]:
+        """한 파일의 청크를 정제하고 (결과, 지난 실행과 비교한 청크 변경 수)를 반환합니다.
+        
+        지난 실행과 같은 청크는 지난 정제 결과를 이어 붙이고, 바뀐 청크만 요청합니다.
+        중단되면 체크포인트를 남기고, 끝나면 다음 실행을 위해 이번 결과를 저장합니다."""
+        manifest = self.open_manifest(source_path)
+        previous, changes = manifest.align(sentences) if manifest and manifest.entries else (None, None)
+        journal = self.open_journal(source_path)
+        completed = False
         try:
-            response = self.client.chat.completions.create(
-                model=Config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an AI assistant that refines lecture content. Remove unnecessary interjections and filler words while preserving the core educational content. Keep the lecture's main points and explanations intact."},
-                    {"role": "user", "content": sentence}
-                ],
-                temperature=Config.OPENAI_TEMPERATURE,
-                # max_tokens=Config.OPENAI_MAX_TOKENS
-            )
-            
-            # 토큰 사용량 계산
-            self.total_tokens["input"] += response.usage.prompt_tokens
-            self.total_tokens["output"] += response.usage.completion_tokens
-            
-            return response.choices[0].message.content.strip(), self.calculate_cost()
+            results = await self.process_sentences_async(sentences, on_result, engine=engine, journal=journal,
+                                                         source=os.path.basename(source_path), previous=previous,
+                                                         on_token=on_token)
+            completed = not any(result.rejected for result in results)
+        finally:
+            self.close_journal(journal, completed)
+        if manifest:
+            manifest.save(sentences, [None if result.rejected else result.text for result in results])
+        return results, changes
+    
+    def create_client(self) -> "AsyncOpenAI":
+        from openai import AsyncOpenAI
+        base_url = api_base_url()
+        # 재시도는 스케줄러가 담당하므로 클라이언트 자체 재시도는 끈다
+        return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=base_url, max_retries=0)
+    
+    def create_engine(self, client: "AsyncOpenAI") -> AsyncRefineEngine:
+        return AsyncRefineEngine(
+            client,
+            self.scheduler,
+            model=Config.OPENAI_MODEL,
+            temperature=Config.OPENAI_TEMPERATURE,
+            system_prompt=Config.SYSTEM_PROMPT,
+            max_concurrency=Config.MAX_CONCURRENT_REQUESTS,
+            batch_size=Config.BATCH_SIZE,
+            batch_max_tokens=Config.BATCH_MAX_TOKENS
+        )
+    
+    async def process_sentences_async(self, sentences: List[str],
+                                      on_result: Optional[Callable[[RefineResult], None]] = None,
+                                      engine: Optional[AsyncRefineEngine] = None,
+                                      journal: Optional[CheckpointJournal] = None,
+                                      start_index: int = 0,
+                                      source: str = "-",
+                                      previous: Optional[Dict[int, str]] = None,
+                                      on_token: Optional[TokenCallback] = None,
+                                      context: Optional[str] = None) -> List[RefineResult]:
+        """AsyncOpenAI 클라이언트로 문장들을 동시에 정제합니다. 실패한 문장은 원문과 오류가 담긴 결과로 반환됩니다.
+        
+        여러 파일을 함께 처리할 때는 engine을 넘겨 클라이언트와 동시 요청 수 제한을 공유합니다.
+        journal을 넘기면 완료된 청크를 기록하고, 이전 실행에서 완료된 청크는 다시 요청하지 않습니다.
+        start_index는 sentences[0]의 청크 번호이고, source는 지표를 파일별로 집계할 때 쓰는 이름입니다.
+        previous는 지난 실행에서 바뀌지 않은 청크의 {청크 번호: 정제 결과}입니다.
+        on_token을 넘기면 응답을 스트리밍으로 받으며 받은 조각을 바로 전달합니다.
+        청크마다 라우터가 고른 단계(로컬 정제 또는 모델)로 처리하며, 캐시는 모델별로 구분합니다.
+        CONTEXT_SENTENCES가 1 이상이면 앞 청크 원문의 끝부분을 참고 문맥으로 함께 보냅니다. context는 sentences[0]
+        앞 청크의 원문입니다. 정제 결과가 아닌 원문을 쓰므로 앞 청크의 완료를 기다리지 않고 모두 동시에 요청합니다."""
+        results: List[Optional[RefineResult]] = [None] * len(sentences)
+        # 청크별 처리 단계와 API에 보낼 문장 (로컬 정제를 거친 문장)
+        routes: List[Optional[Route]] = [None] * len(sentences)
+        contexts: List[Optional[str]] = [None] * len(sentences)
+        
+        # 지난 실행과 비교해 바뀐 청크는 수정한 내용이 반영되도록 유사 청크를 재사용하지 않는다
+        dedup = self.dedup if previous is None else None
+        
+        # 체크포인트, 로컬 정제, 캐시, 유사 청크로 끝나는 문장은 API를 호출하지 않는다
+        pending = []
+        for offset, sentence in enumerate(sentences):
+            index = start_index + offset
+            resumed = previous.get(index) if previous else None
+            if resumed is None and journal:
+                resumed = journal.get(index, sentence)
+            if resumed is not None:
+                results[offset] = RefineResult(index, resumed, resumed=True)
+            else:
+                route = routes[offset] = self.router.route(sentence)
+                if route.model is None:
+                    results[offset] = RefineResult(index, route.text, skipped=True, tier=route.tier)
+                else:
+                    contexts[offset] = self.chunk_context(sentences[offset - 1] if offset else context)
+                    key = self.cache_key(route.text, route.model, contexts[offset])
+                    cached = self.cache.get(key) if self.cache else None
+                    duplicate = dedup.find(route.text) if dedup and cached is None else None
+                    if cached is not None:
+                        results[offset] = RefineResult(index, cached, cached=True, model=route.model, tier=route.tier)
+                    elif duplicate is not None:
+                        results[offset] = self.reuse_duplicate(index, route.text, duplicate[0], route)
+                    else:
+                        pending.append(index)
+                        continue
+                if journal:
+                    journal.record(index, sentence, results[offset].text)
+            if on_result:
+                on_result(results[offset])
+        
+        def handle_result(result: RefineResult):
+            offset = result.index - start_index
+            result.tier = routes[offset].tier
+            result.cost = self.calculate_chunk_cost(result.input_tokens, result.output_tokens, result.model)
+            # 완료되는 즉시 저장하여 중간에 멈춰도 다음 실행에서 재사용
+            if not result.rejected:
+                if self.cache:
+                    self.cache.put(self.cache_key(routes[offset].text, result.model, contexts[offset]), result.text)
+                if self.dedup:
+                    self.dedup.add(routes[offset].text, result.text)
+                if journal:
+                    journal.record(result.index, sentences[offset], result.text)
+            if on_result:
+                on_result(result)
+        
+        # 이번 실행 안에서 거의 같은 청크는 처음 것만 요청하고 나머지는 그 결과를 재사용
+        duplicates = {}
+        if dedup and len(pending) > 1:
+            local_index = dedup.local_index()
+            unique = []
+            for index in pending:
+                match = local_index.query(routes[index - start_index].text)
+                if match is None:
+                    local_index.add(index, routes[index - start_index].text)
+                    unique.append(index)
+                else:
+                    duplicates[index] = match[0]
+            pending = unique
+        
+        async def refine_pending(engine: AsyncRefineEngine) -> List[RefineResult]:
+            # 모델별로 나누어 같은 엔진으로 동시에 요청하므로 동시 요청 수 제한과 분당 한도를 함께 쓴다
+            by_model: Dict[str, List[int]] = {}
+            for index in pending:
+                by_model.setdefault(routes[index - start_index].model, []).append(index)
+            refined = await asyncio.gather(*(
+                engine.refine_all([routes[index - start_index].text for index in indices], handle_result,
+                                  indices=indices, on_token=on_token, model=model,
+                                  contexts=[contexts[index - start_index] for index in indices])
+                for model, indices in by_model.items()
+            ))
+            return [result for model_results in refined for result in model_results]
+        
+        if pending:
+            if engine is None:
+                # AsyncOpenAI 클라이언트는 이벤트 루프에 묶이므로 실행마다 새로 생성
+                async with self.create_client() as client:
+                    refined = await refine_pending(self.create_engine(client))
+            else:
+                refined = await refine_pending(engine)
             
-        except Exception as e:
-            return f"오류가 발생했습니다: {str(e)}", 0.0
+            for result in refined:
+                self.total_tokens["input"] += result.input_tokens
+                self.total_tokens["output"] += result.output_tokens
+                results[result.index - start_index] = result
+        
+        for index, original in duplicates.items():
+            offset = index - start_index
+            source_result = results[original - start_index]
+            if source_result.rejected:
+                results[offset] = RefineResult(index, sentences[offset], tier=routes[offset].tier,
+                                               error=source_result.error)
+            else:
+                results[offset] = self.reuse_duplicate(index, routes[offset].text, source_result.text, routes[offset])
+                if journal:
+                    journal.record(index, sentences[offset], results[offset].text)
+            if on_result:
+                on_result(results[offset])
+        self.metrics.record(source, results)
+        return results
     
-    def calculate_cost(self) -> float:
-        """토큰 사용량에 따른 비용을 계산합니다."""
-        model = Config.OPENAI_MODEL
-        input_cost = (self.total_tokens["input"] / 1_000_000) * self.token_costs[model]["input"]
-        output_cost = (self.total_tokens["output"] / 1_000_000) * self.token_costs[model]["output"]
+    async def process_stream(self, chunks: Iterable[str], window: int,
+                             engine: Optional[AsyncRefineEngine] = None,
+                             journal: Optional[CheckpointJournal] = None,
+                             source: str = "-") -> AsyncIterator[RefineResult]:
+        """청크를 차례로 읽어 최대 window개까지 동시에 정제하고, 입력 순서대로 결과를 내보냅니다."""
+        if engine is None:
+            async with self.create_client() as client:
+                async for result in self.process_stream(chunks, window, self.create_engine(client), journal, source):
+                    yield result
+            return
+        
+        async def refine(index: int, chunk: str, previous: Optional[str]) -> RefineResult:
+            results = await self.process_sentences_async([chunk], engine=engine, journal=journal, start_index=index,
+                                                         source=source, context=previous)
+            return results[0]
+        
+        in_flight = deque()
+        previous = None
+        for index, chunk in enumerate(chunks):
+            in_flight.append(asyncio.ensure_future(refine(index, chunk, previous)))
+            previous = chunk
+            # 가장 먼저 시작한 청크가 끝나야 다음 청크를 읽으므로 메모리에 남는 청크 수가 제한된다
+            if len(in_flight) >= window:
+                yield await in_flight.popleft()
+        while in_flight:
+            yield await in_flight.popleft()
+    
+    @staticmethod
+    def close_journal(journal: Optional[CheckpointJournal], completed: bool):
+        """모든 청크가 완료되었으면 체크포인트를 삭제하고, 아니면 다음 실행을 위해 남겨둡니다."""
+        if journal is None:
+            return
+        if completed:
+            journal.complete()
+        else:
+            journal.close()
+    
+    @staticmethod
+    def run_name(source_path: str) -> str:
+        """원본 파일과 정제 설정별로 구분되는 파일 이름 (확장자 제외)"""
+        tiers = Config.MODEL_TIERS if Config.ROUTING_ENABLED else None
+        key_source = json.dumps([os.path.abspath(source_path), Config.OPENAI_MODEL, Config.OPENAI_TEMPERATURE,
+                                 Config.SYSTEM_PROMPT, tiers, Config.CONTEXT_SENTENCES, Config.PREFILTER_ENABLED,
+                                 Config.PREFILTER_SKIP_API], ensure_ascii=False)
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        return f"{name}_{key}"
+    
+    def open_journal(self, source_path: str) -> Optional[CheckpointJournal]:
+        """원본 파일과 정제 설정별 체크포인트 파일을 엽니다."""
+        if not Config.CHECKPOINT_ENABLED:
+            return None
+        return CheckpointJournal(os.path.join(Config.CHECKPOINT_DIR, f"{self.run_name(source_path)}.jsonl"))
+    
+    def open_manifest(self, source_path: str) -> Optional[RunManifest]:
+        """원본 파일과 정제 설정별 지난 실행 결과 파일을 엽니다."""
+        if not Config.INCREMENTAL_ENABLED:
+            return None
+        return RunManifest(os.path.join(Config.INCREMENTAL_DIR, f"{self.run_name(source_path)}.json"))
+    
+    def calculate_chunk_cost(self, input_tokens: int, output_tokens: int, model: Optional[str] = None) -> float:
+        """단일 요청의 토큰 사용량에 따른 비용을 모델별 단가로 계산합니다."""
+        model = model or Config.OPENAI_MODEL
+        input_cost = (input_tokens / 1_000_000) * self.token_costs[model]["input"]
+        output_cost = (output_tokens / 1_000_000) * self.token_costs[model]["output"]
         return input_cost + output_cost
+    
+    def calculate_cost(self) -> float:
+        """이 TextProcessor로 처리한 전체 요청의 누적 비용을 계산합니다. (모델마다 단가가 달라 청크별 비용을 더함)"""
+        return self.metrics.total()["cost_usd"]
 
 class FileManager:
-    def __init__(self):
-        self.data_dir = Config.DATA_DIR
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or Config.DATA_DIR
         os.makedirs(self.data_dir, exist_ok=True)
     
-    def save_processed_text(self, text: str, original_filename: str) -> str:
-        """처리된 텍스트를 파일로 저장합니다."""
+    def open_processed_text(self, original_filename: str) -> Tuple[str, TextIO]:
+        """처리 결과를 저장할 파일을 열고 (경로, 파일 객체)를 반환합니다."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{os.path.splitext(original_filename)[0]}_{timestamp}.txt"
         filepath = os.path.join(self.data_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
+        return filepath, open(filepath, 'w', encoding='utf-8')
+    
+    def save_processed_text(self, text: str, original_filename: str) -> str:
+        """처리된 텍스트를 파일로 저장합니다."""
+        filepath, f = self.open_processed_text(original_filename)
+        with f:
             f.write(text)
         
         return filepath
+    
+    def chunk_store_path(self, source_path: str) -> str:
+        """원본 파일별 청크 저장소 경로 (실행할 때마다 새로 만들지 않고 교체)
+        
+        다른 폴더의 같은 이름 파일이 서로 덮어쓰지 않도록 절대 경로의 해시를 이름에 붙입니다."""
+        key = hashlib.sha256(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:8]
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(self.data_dir, "chunks", f"{name}_{key}.jsonl")
+    
+    def open_chunk_store(self, source_path: str) -> ChunkStoreWriter:
+        return ChunkStoreWriter(self.chunk_store_path(source_path), source_path, Config.OPENAI_MODEL)
+    
+    def save_chunk_store(self, source_path: str, chunks: List[str], results: List[RefineResult]) -> str:
+        """청크별 원문 위치, 정제 결과, 모델, 해시, 비용을 청크 저장소에 저장합니다."""
+        with open(source_path, 'r', encoding='utf-8') as f:
+            spans = locate_spans(f.read(), chunks)
+        with self.open_chunk_store(source_path) as writer:
+            for chunk, result, span in zip(chunks, results, spans):
+                writer.write(chunk, result, span)
+        return writer.path
+    
+    def save_refined(self, source_path: str, chunks: List[str], results: List[RefineResult]) -> str:
+        """청크 저장소를 저장하고, 그 정제 결과를 이어 붙인 txt 파일을 만들어 경로를 반환합니다."""
+        store_path = self.save_chunk_store(source_path, chunks, results)
+        with ChunkStore(store_path) as store:
+            return self.save_processed_text(store.export_text(), f"ai_processed_{os.path.basename(source_path)}")
 
 class SentenceSplitter:
     def __init__(self):
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
+        # 분리기는 프로세스당 한 번만 만들어 재사용
+        segmenter = available_segmenter(Config.SEGMENTER, Config.NLTK_DATA_DIR)
+        self.segmenter = get_segmenter(segmenter, Config.NLTK_DATA_DIR)
         
         self.MIN_SENTENCE_LENGTH = Config.MIN_SENTENCE_LENGTH
         self.MAX_SENTENCE_LENGTH = Config.MAX_SENTENCE_LENGTH
+        self.PACKING_MODE = Config.PACKING_MODE
+        self.MAX_CHUNK_TOKENS = Config.MAX_CHUNK_TOKENS
+        self.token_counter = TokenCounter(Config.OPENAI_MODEL) if self.PACKING_MODE == "tokens" else None
 
     def process_sentences(self, sentences: List[str]) -> List[str]:
-        processed_sentences = []
+        return [" ".join(group) for group in self.group_sentences(sentences)]
+
+    def group_sentences(self, sentences: List[str]) -> List[List[str]]:
+        """문장을 청크별 문장 목록으로 나눕니다. 청크는 목록의 문장을 공백 하나로 이어 붙인 것입니다."""
+        if self.PACKING_MODE == "tokens":
+            return self.pack_by_tokens(sentences)
+        if self.PACKING_MODE == "stable":
+            return self.pack_stable(sentences)
+        
+        groups = []
         i = 0
         
         while i < len(sentences):
@@ -113,31 +560,420 @@ class SentenceSplitter:
                 continue
             
             # 문장 병합 시도
+            group = [current_sentence]
+            length = len(current_sentence)
             while i + 1 < len(sentences):
                 next_sentence = sentences[i + 1].strip()
-                if len(current_sentence) + len(next_sentence) <= self.MAX_SENTENCE_LENGTH:
-                    current_sentence = f"{current_sentence} {next_sentence}"
+                if length + len(next_sentence) <= self.MAX_SENTENCE_LENGTH:
+                    group.append(next_sentence)
+                    length += 1 + len(next_sentence)
                     i += 1
                 else:
                     break
             
-            processed_sentences.append(current_sentence)
+            groups.append(group)
             i += 1
             
-        return processed_sentences
+        return groups
+
+    def pack_by_tokens(self, sentences: List[str]) -> List[List[str]]:
+        """토큰 예산(MAX_CHUNK_TOKENS) 안에서 청크 수가 가장 적고 크기가 고르게 되도록 문장을 병합합니다."""
+        sentences = [s.strip() for s in sentences if len(s.strip()) >= self.MIN_SENTENCE_LENGTH]
+        counts = [self.token_counter.count(s) for s in sentences]
+        budget = self.MAX_CHUNK_TOKENS
+        
+        # best[i]: sentences[:i]를 나누는 최적 (청크 수, 남는 토큰 수 제곱합)
+        best: List[Optional[Tuple[int, int]]] = [(0, 0)] + [None] * len(sentences)
+        prev = [0] * (len(sentences) + 1)
+        for i in range(1, len(sentences) + 1):
+            total = 0
+            for j in range(i - 1, -1, -1):
+                total += counts[j]
+                # 예산을 넘는 단일 문장은 그대로 하나의 청크로 둔다
+                if total > budget and j < i - 1:
+                    break
+                # 마지막 청크는 다음 문장과 더 병합될 수 있으므로(스트리밍) 남는 토큰을 따지지 않는다
+                slack = max(budget - total, 0) if i < len(sentences) else 0
+                candidate = (best[j][0] + 1, best[j][1] + slack * slack)
+                if best[i] is None or candidate < best[i]:
+                    best[i] = candidate
+                    prev[i] = j
+        
+        groups = []
+        i = len(sentences)
+        while i > 0:
+            groups.append(sentences[prev[i]:i])
+            i = prev[i]
+        return groups[::-1]
+
+    def pack_stable(self, sentences: List[str]) -> List[List[str]]:
+        """문장 내용으로 청크 경계를 정해, 일부 문장을 고쳐도 뒤쪽 청크의 경계가 밀리지 않도록 병합합니다.
+        
+        내용 해시가 STABLE_ANCHOR_PERIOD로 나누어떨어지는 문장(앵커) 뒤에서 청크를 끝내고,
+        MAX_SENTENCE_LENGTH를 넘을 때만 길이로 자릅니다. 순차 병합은 앞 문장의 길이가 바뀌면
+        이후 모든 경계가 밀리지만, 이 방식은 다음 앵커에서 경계가 다시 맞춰집니다."""
+        min_length = self.MAX_SENTENCE_LENGTH // 4
+        groups = []
+        current = []
+        length = 0
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if len(sentence) < self.MIN_SENTENCE_LENGTH:
+                continue
+            if current and length + 1 + len(sentence) > self.MAX_SENTENCE_LENGTH:
+                groups.append(current)
+                current = []
+                length = 0
+            length += len(sentence) + (1 if current else 0)
+            current.append(sentence)
+            if length >= min_length and self.is_anchor(sentence):
+                groups.append(current)
+                current = []
+                length = 0
+        if current:
+            groups.append(current)
+        return groups
+    
+    @staticmethod
+    def is_anchor(sentence: str) -> bool:
+        digest = hashlib.blake2b(sentence.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'little') % Config.STABLE_ANCHOR_PERIOD == 0
+
+    def tokenize(self, text: str) -> List[str]:
+        """병합하지 않은 원래 문장 목록을 반환합니다."""
+        return self.segmenter.tokenize(text)
 
     def split_sentences(self, text: str) -> List[str]:
-        sentences = nltk.sent_tokenize(text)
+        sentences = self.tokenize(text)
         return self.process_sentences(sentences)
 
+    def iter_file_chunks(self, file_path: str) -> Iterator[str]:
+        """파일을 블록 단위로 읽으며 병합된 청크를 하나씩 내보냅니다."""
+        blocks = read_blocks(file_path, Config.STREAM_BLOCK_SIZE)
+        sentences = stream_sentences(blocks, self.tokenize, self.MAX_SENTENCE_LENGTH)
+        return stream_chunks(sentences, self.group_sentences, Config.STREAM_PACK_WINDOW)
+
+# SentenceSplitter가 만들 때 읽는 설정 (바뀌면 분리기를 새로 만든다)
+SPLITTER_SETTINGS = ("SEGMENTER", "NLTK_DATA_DIR", "MIN_SENTENCE_LENGTH", "MAX_SENTENCE_LENGTH", "PACKING_MODE",
+                     "MAX_CHUNK_TOKENS", "OPENAI_MODEL")
+
+@lru_cache(maxsize=None)
+def cached_splitter(settings: tuple) -> "SentenceSplitter":
+    return SentenceSplitter()
+
+def get_splitter() -> SentenceSplitter:
+    """설정이 같으면 프로세스에서 한 번 만든 SentenceSplitter를 재사용합니다."""
+    return cached_splitter(tuple(getattr(Config, name) for name in SPLITTER_SETTINGS))
+
 def process_file(file_path: str) -> List[str]:
     """파일을 읽어서 문장을 분리합니다."""
     with open(file_path, 'r', encoding='utf-8') as f:
         text = f.read()
-    splitter = SentenceSplitter()
-    return splitter.split_sentences(text)
+    return get_splitter().split_sentences(text)
+
+def split_file(file_path: str) -> Tuple[List[str], float]:
+    """프로세스 풀에서 실행됩니다. 파일을 문장 분리하고 (문장 목록, 소요 시간)을 반환합니다."""
+    start = time.perf_counter()
+    sentences = process_file(file_path)
+    return sentences, time.perf_counter() - start
+
+def collect_input_files(inputs: List[str]) -> List[str]:
+    """디렉토리, 파일 경로, glob 패턴에서 처리할 txt 파일 목록을 만듭니다."""
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.txt"))
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        for path in sorted(matches):
+            if os.path.isfile(path) and path not in files:
+                files.append(path)
+    return files
+
+async def refine_files(processor: TextProcessor, files: Dict[str, List[str]],
+                       on_result: Optional[Callable[[RefineResult], None]] = None) -> Dict[str, Tuple[List[RefineResult], float]]:
+    """모든 파일의 청크를 하나의 클라이언트와 동시 요청 제한을 공유하며 정제합니다."""
+    async with processor.create_client() as client:
+        engine = processor.create_engine(client)
+        
+        async def run(path: str, sentences: List[str]):
+            start = time.perf_counter()
+            results, _ = await processor.refine_file_async(path, sentences, on_result, engine)
+            return path, (results, time.perf_counter() - start)
+        
+        return dict(await asyncio.gather(*(run(path, sentences) for path, sentences in files.items())))
+
+def process_files(processor: Optional[TextProcessor], paths: List[str], file_manager: FileManager,
+                  workers: Optional[int]) -> Dict[str, dict]:
+    """모든 파일을 병렬로 문장 분리한 뒤 한꺼번에 정제하고 파일별 통계를 반환합니다."""
+    # 문장 분리는 CPU 작업이므로 프로세스 풀에서 병렬로 실행
+    # Punkt 자료 확인과 경고는 작업자마다 하지 않도록 풀을 만들기 전에 한 번만
+    available_segmenter(Config.SEGMENTER, Config.NLTK_DATA_DIR)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        split_results = dict(zip(paths, pool.map(split_file, paths)))
+    files = {path: sentences for path, (sentences, _) in split_results.items()}
+    
+    refined = {}
+    if processor:
+        from tqdm import tqdm
+        with tqdm(total=sum(len(sentences) for sentences in files.values()), desc="문장 처리 중") as pbar:
+            refined = asyncio.run(refine_files(processor, files, on_result=lambda _: pbar.update(1)))
+    
+    stats = {}
+    for path in paths:
+        sentences, split_time = split_results[path]
+        filename = os.path.basename(path)
+        if processor is None:
+            saved_path = file_manager.save_processed_text("\n    ".join(sentences), filename)
+            refine_time, rejected, cost = 0.0, 0, 0.0
+        else:
+            results, refine_time = refined[path]
+            saved_path = file_manager.save_refined(path, sentences, results)
+            rejected = sum(result.rejected for result in results)
+            cost = sum(result.cost for result in results)
+        stats[path] = {"chunks": len(sentences), "split_time": split_time, "refine_time": refine_time,
+                       "rejected": rejected, "cost": cost, "saved_path": saved_path}
+    return stats
+
+async def stream_files(processor: Optional[TextProcessor], paths: List[str], file_manager: FileManager) -> Dict[str, dict]:
+    """파일을 블록 단위로 읽고 분리, 병합, 정제한 청크를 순서대로 바로 저장합니다. 파일별 통계를 반환합니다."""
+    splitter = get_splitter()
+    if processor:
+        # 청크별 기록을 쌓지 않고 파일별 집계만 유지
+        processor.metrics.keep_records = False
+    
+    async def run(path: str, engine: Optional[AsyncRefineEngine]):
+        start = time.perf_counter()
+        filename = os.path.basename(path)
+        chunks = splitter.iter_file_chunks(path)
+        stat = {"chunks": 0, "split_time": None, "refine_time": 0.0, "rejected": 0, "cost": 0.0}
+        
+        def write(f: TextIO, result: RefineResult, chunk: Optional[str] = None, store: Optional[ChunkStoreWriter] = None):
+            if stat["chunks"]:
+                f.write("\n    ")
+            f.write(result.text)
+            f.flush()
+            if store:
+                # 스트리밍 중에는 원문 전체를 메모리에 올리지 않으므로 원문 위치는 기록하지 않는다
+                store.write(chunk, result)
+            stat["chunks"] += 1
+            stat["rejected"] += result.rejected
+            stat["cost"] += result.cost
+        
+        if engine is None:
+            stat["saved_path"], f = file_manager.open_processed_text(filename)
+            with f:
+                for index, chunk in enumerate(chunks):
+                    write(f, RefineResult(index, chunk))
+        else:
+            stat["saved_path"], f = file_manager.open_processed_text(f"ai_processed_{filename}")
+            journal = processor.open_journal(path)
+            completed = False
+            # process_stream은 입력 순서대로 결과를 내보내므로 읽은 청크를 순서대로 짝지을 수 있다
+            read_chunks = deque()
+            
+            def remember(chunk_iter: Iterable[str]) -> Iterator[str]:
+                for chunk in chunk_iter:
+                    read_chunks.append(chunk)
+                    yield chunk
+            
+            try:
+                with f, file_manager.open_chunk_store(path) as store:
+                    async for result in processor.process_stream(remember(chunks), Config.STREAM_IN_FLIGHT, engine,
+                                                                 journal, filename):
+                        write(f, result, read_chunks.popleft(), store)
+                completed = stat["rejected"] == 0
+            finally:
+                processor.close_journal(journal, completed)
+        stat["refine_time"] = time.perf_counter() - start
+        return path, stat
+    
+    if processor is None:
+        return dict([await run(path, None) for path in paths])
+    async with processor.create_client() as client:
+        engine = processor.create_engine(client)
+        return dict(await asyncio.gather(*(run(path, engine) for path in paths)))
+
+def run_cli(inputs: List[str], workers: Optional[int], split_only: bool, output_dir: Optional[str],
+            stream: bool = False, metrics_path: Optional[str] = None) -> int:
+    """입력 없이 여러 파일을 병렬로 처리하고 파일별 처리량을 출력합니다. 처리하지 못한 청크가 있으면 1을 반환합니다."""
+    paths = collect_input_files(inputs)
+    if not paths:
+        print(f"처리할 txt 파일이 없습니다: {' '.join(inputs)}")
+        return 1
+    
+    file_manager = FileManager(output_dir)
+    processor = None if split_only else TextProcessor()
+    if processor and processor.routing_summary():
+        print(processor.routing_summary())
+    run_start = time.perf_counter()
+    
+    if stream:
+        stats = asyncio.run(stream_files(processor, paths, file_manager))
+    else:
+        stats = process_files(processor, paths, file_manager, workers)
+    
+    print(f"\n{'파일':<30} {'청크':>6} {'분리(초)':>9} {'정제(초)':>9} {'청크/초':>8} {'실패':>5} {'비용($)':>9}")
+    for path in paths:
+        stat = stats[path]
+        split_time = stat["split_time"]
+        elapsed = (split_time or 0.0) + stat["refine_time"]
+        throughput = stat["chunks"] / elapsed if elapsed > 0 else 0.0
+        split_column = f"{split_time:>9.2f}" if split_time is not None else f"{'-':>9}"
+        print(f"{os.path.basename(path):<30} {stat['chunks']:>6} {split_column} {stat['refine_time']:>9.2f} "
+              f"{throughput:>8.1f} {stat['rejected']:>5} {stat['cost']:>9.4f}  -> {stat['saved_path']}")
+    
+    total_chunks = sum(stat["chunks"] for stat in stats.values())
+    rejected_total = sum(stat["rejected"] for stat in stats.values())
+    elapsed = time.perf_counter() - run_start
+    print(f"\n총 {len(paths)}개 파일, {total_chunks}개 청크, {elapsed:.2f}초 ({total_chunks / elapsed:.1f} 청크/초)")
+    if processor:
+        print_metrics(processor.metrics.total())
+        print_cache_stats(processor)
+        print_dedup_savings(processor)
+        if metrics_path:
+            print(f"요청별 지표를 저장했습니다: {processor.metrics.save(metrics_path)}")
+    if rejected_total:
+        print(f"처리하지 못한 청크 {rejected_total}개는 원문을 유지했습니다.")
+        return 1
+    return 0
+
+def print_metrics(summary: dict):
+    """지표 집계 결과(요청 수, 재시도, 토큰, 지연 시간, 비용)를 출력합니다."""
+    sources = summary["sources"]
+    latency = summary["latency"]
+    print(f"API 요청 {sources['api']}개 (재시도 {summary['retries']}회), 캐시 {sources['cache']}개, "
+          f"유사 청크 {sources['dedup']}개, 사전 정제 {sources['prefilter']}개, 이전 실행 {sources['resumed']}개")
+    print(f"토큰: 입력 {summary['input_tokens']} / 출력 {summary['output_tokens']}, "
+          f"요청 지연 p50 {latency['p50']:.2f}초 / p95 {latency['p95']:.2f}초 / 최대 {latency['max']:.2f}초")
+    if summary["first_token"]["count"]:
+        first_token = summary["first_token"]
+        print(f"첫 토큰까지 걸린 시간: p50 {first_token['p50']:.2f}초 / p95 {first_token['p95']:.2f}초 / "
+              f"최대 {first_token['max']:.2f}초")
+    if summary["tiers"]:
+        tiers = []
+        for tier, stat in summary["tiers"].items():
+            detail = f" (요청 {stat['requests']}개, ${stat['cost_usd']:.4f})" if stat["requests"] else ""
+            tiers.append(f"{tier} {stat['chunks']}개{detail}")
+        print(f"처리 단계: {', '.join(tiers)}")
+        bypassed = {tier: summary["tiers"][tier]["chunks"] for tier in ("skip", "local") if tier in summary["tiers"]}
+        if bypassed:
+            print(f"모델을 거치지 않은 청크: 원문 그대로 {bypassed.get('skip', 0)}개, "
+                  f"규칙 정제만 {bypassed.get('local', 0)}개 (PREFILTER_SKIP_API = False로 끄면 모두 모델로 정제)")
+    print(f"총 API 사용 비용: ${summary['cost_usd']:.4f} (약 {int(summary['cost_krw'])}원)")
+
+def print_cache_stats(processor: TextProcessor):
+    """프로세스가 시작된 뒤의 캐시 조회 결과(적중/미적중 횟수)를 출력합니다."""
+    if processor.cache:
+        print(f"캐시 적중 {processor.cache.hits}회 / 미적중 {processor.cache.misses}회")
+
+def print_dedup_savings(processor: TextProcessor):
+    savings = processor.dedup_savings
+    if savings["chunks"]:
+        print(f"유사 청크 {savings['chunks']}개의 정제 결과를 재사용해 약 {savings['tokens']} 토큰 "
+              f"(${savings['cost']:.4f})을 절약했습니다.")
+
+def run_batch_job(poll_interval: float):
+    """assets 폴더의 모든 파일을 Batch API로 처리합니다. 중단된 작업이 있으면 이어서 진행합니다."""
+    from openai import OpenAI
+    processor = TextProcessor()
+    file_manager = FileManager()
+    base_url = api_base_url()
+    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=base_url)
+    job = BatchJob(client, Config.BATCH_JOB_DIR, Config.OPENAI_MODEL, Config.OPENAI_TEMPERATURE, Config.SYSTEM_PROMPT)
+    
+    if job.has_pending() and job.state["status"] == "failed":
+        status = job.state.get("batch_status")
+        print(f"이전 배치가 {status} 상태로 끝나 결과를 받지 못한 청크 {job.retry_failed()}개를 다시 제출합니다.")
+    elif job.has_pending():
+        print(f"중단된 배치 작업을 이어서 진행합니다. (상태: {job.state['status']})")
+    else:
+        txt_files = sorted(f for f in os.listdir(Config.ASSETS_DIR) if f.endswith('.txt'))
+        if not txt_files:
+            print("assets 폴더에 txt 파일이 없습니다.")
+            return
+        
+        files = {}
+        cached = {}
+        for file_no, filename in enumerate(txt_files):
+            files[filename] = process_file(os.path.join(Config.ASSETS_DIR, filename))
+            # 캐시에 있는 청크는 제출하지 않는다
+            for index, chunk in enumerate(files[filename]):
+                text = processor.cache.get(processor.cache_key(chunk)) if processor.cache else None
+                if text is not None:
+                    cached[BatchJob.custom_id(file_no, index)] = text
+        job.prepare(files, cached)
+        total = sum(len(chunks) for chunks in files.values())
+        print(f"{len(files)}개 파일, {total}개 청크 중 {total - len(cached)}개를 배치 입력으로 만들었습니다.")
+        print_cache_stats(processor)
+    
+    job.submit()
+    if job.state["batch_id"]:
+        print(f"배치 작업 완료를 기다리는 중... (batch_id: {job.state['batch_id']})")
+    try:
+        job.wait(poll_interval)
+    except RuntimeError as e:
+        print(e)
+        return
+    
+    total_cost = 0.0
+    for filename, result in job.collect().items():
+        cost = processor.calculate_chunk_cost(result["usage"]["input"], result["usage"]["output"]) * Config.BATCH_JOB_DISCOUNT
+        total_cost += cost
+        if filename not in job.saved_paths():
+            if processor.cache:
+                chunks = job.state["files"][filename]
+                for index, (chunk, text) in enumerate(zip(chunks, result["texts"])):
+                    if index not in result["rejected"]:
+                        processor.cache.put(processor.cache_key(chunk), text)
+            saved_path = file_manager.save_processed_text("\n    ".join(result["texts"]), f"ai_processed_{filename}")
+            job.mark_saved(filename, saved_path)
+        print(f"{filename}: {job.saved_paths()[filename]}")
+        if result["rejected"]:
+            print(f"  처리하지 못한 청크 {len(result['rejected'])}개 (원문 유지): {[i + 1 for i in result['rejected']]}")
+            for index, message in list(result["errors"].items())[:5]:
+                print(f"    {index + 1}번: {message}")
+    job.finish()
+    print(f"\n총 API 사용 비용: ${total_cost:.4f} (약 {int(total_cost * processor.EXCHANGE_RATE)}원)")
 
 def main():
+    parser = argparse.ArgumentParser(description="강의 음성 텍스트 전처리 도구")
+    parser.add_argument("inputs", nargs="*",
+                        help="처리할 txt 파일, 디렉토리 또는 glob 패턴 (지정하면 메뉴 없이 전체를 처리합니다)")
+    parser.add_argument("--split-only", action="store_true", help="AI 전처리 없이 문장 분리 결과만 저장합니다")
+    parser.add_argument("--workers", type=int, default=None, help="문장 분리에 사용할 프로세스 수 (기본값: CPU 수)")
+    parser.add_argument("--output-dir", default=None, help=f"결과 저장 디렉토리 (기본값: {Config.DATA_DIR})")
+    parser.add_argument("--stream", action="store_true",
+                        help="파일을 블록 단위로 읽어 처리한 청크부터 바로 저장합니다 (큰 파일의 메모리 사용량 제한)")
+    parser.add_argument("--metrics", default=Config.METRICS_PATH,
+                        help="요청별 토큰, 지연 시간, 재시도, 비용 지표를 저장할 경로 (.json이면 JSON, 그 외에는 Prometheus 형식)")
+    parser.add_argument("--batch-job", action="store_true",
+                        help="assets 폴더의 모든 파일을 Batch API로 처리합니다 (중단 시 이어서 진행)")
+    parser.add_argument("--poll-interval", type=float, default=Config.BATCH_JOB_POLL_INTERVAL,
+                        help="배치 작업 상태 확인 간격 (초)")
+    parser.add_argument("--serve", action="store_true",
+                        help="여러 사용자의 작업을 받아 처리하는 공유 정제 서비스를 실행합니다")
+    parser.add_argument("--port", type=int, default=Config.SERVICE_PORT, help="--serve로 실행할 서비스 포트")
+    parser.add_argument("--service", default=None,
+                        help="입력 파일을 직접 처리하지 않고 실행 중인 정제 서비스(예: http://127.0.0.1:8780)에 제출합니다")
+    args = parser.parse_args()
+    
+    if args.batch_job:
+        run_batch_job(args.poll_interval)
+        return
+    
+    if args.serve:
+        from worker_service import serve
+        serve(Config.SERVICE_HOST, args.port, args.workers)
+        return
+    
+    if args.inputs and args.service:
+        from worker_service import run_service_cli
+        sys.exit(run_service_cli(args.service, args.inputs, timeout=Config.SERVICE_WAIT_TIMEOUT))
+    
+    if args.inputs:
+        sys.exit(run_cli(args.inputs, args.workers, args.split_only, args.output_dir, args.stream, args.metrics))
+    
     processor = TextProcessor()
     file_manager = FileManager()
     
@@ -179,9 +1015,10 @@ def main():
         print("\n1. 문장 보기")
         print("2. 결과 txt 저장")
         print("3. AI 전처리")
-        print("4. 종료")
+        print("4. AI 전처리 (결과 실시간 보기)")
+        print("5. 종료")
         
-        choice = input("\n선택하세요 (1-4): ")
+        choice = input("\n선택하세요 (1-5): ")
         
         if choice == '1':
             print("\n=== 분리된 문장 ===")
@@ -193,18 +1030,41 @@ def main():
             saved_path = file_manager.save_processed_text(final_text, selected_file)
             print(f"\n파일이 저장되었습니다: {saved_path}")
         
-        elif choice == '3':
+        elif choice in ('3', '4'):
             print("\nAI 전처리 중...")
-            processed_sentences = []
-            total_cost = 0
-            
-            for sentence in tqdm(sentences, desc="문장 처리 중"):
-                processed_text, cost = processor.process_sentence(sentence)
-                processed_sentences.append(processed_text)
-                total_cost += cost
+            if processor.routing_summary():
+                print(processor.routing_summary())
+            if choice == '3':
+                from tqdm import tqdm
+                with tqdm(total=len(sentences), desc="문장 처리 중") as pbar:
+                    results, changes = processor.refine_file(file_path, sentences, on_result=lambda _: pbar.update(1))
+            else:
+                # 응답을 스트리밍으로 받아 완료된 청크부터 순서대로 바로 출력
+                view = LiveView(len(sentences))
+                results, changes = processor.refine_file(file_path, sentences, on_result=view.on_result,
+                                                         on_token=view.on_token)
+                if view.first_output is not None:
+                    print(f"\n첫 출력까지 걸린 시간: {view.first_output:.2f}초")
+            processed_sentences = [result.text for result in results]
             
             print(f"\nAI 전처리 완료!")
-            print(f"총 API 사용 비용: ${total_cost:.4f} (약 {int(total_cost * processor.EXCHANGE_RATE)}원)")
+            rejected = [result for result in results if result.rejected]
+            if rejected:
+                print(f"\n처리하지 못한 문장 {len(rejected)}개 (원문 유지):")
+                for result in rejected:
+                    print(f"  {result.index + 1}. {result.error} (시도 {result.attempts}회)")
+            if changes:
+                print(f"지난 실행과 비교: 유지 {changes['unchanged']}개, 변경 {changes['changed']}개, "
+                      f"추가 {changes['inserted']}개, 삭제 {changes['deleted']}개 (바뀐 청크만 다시 정제)")
+            if processor.prefilter:
+                print(f"사전 정제로 지운 글자 수: {processor.prefilter.chars_removed}")
+            # 메뉴에서 같은 파일을 여러 번 처리해도 이번 실행의 지표만 출력
+            summary = processor.metrics.summarize(processor.metrics.records[-len(results):])
+            print_metrics(summary)
+            print_cache_stats(processor)
+            print_dedup_savings(processor)
+            if args.metrics:
+                print(f"요청별 지표를 저장했습니다: {processor.metrics.save(args.metrics)}")
             
             while True:
                 print("\n1. 처리된 문장 보기")
@@ -219,9 +1079,9 @@ def main():
                         print(f"\n{i}. {sentence}")
                 
                 elif sub_choice == '2':
-                    final_text = "\n    ".join(processed_sentences)
-                    saved_path = file_manager.save_processed_text(final_text, f"ai_processed_{selected_file}")
+                    saved_path = file_manager.save_refined(file_path, sentences, results)
                     print(f"\n파일이 저장되었습니다: {saved_path}")
+                    print(f"청크 저장소: {file_manager.chunk_store_path(file_path)}")
                 
                 elif sub_choice == '3':
                     break
@@ -229,7 +1089,7 @@ def main():
                 else:
                     print("잘못된 선택입니다. 다시 선택해주세요.")
         
-        elif choice == '4':
+        elif choice == '5':
             print("프로그램을 종료합니다.")
             break
         
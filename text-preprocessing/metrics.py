@@ -0,0 +1,248 @@
+import json
+import os
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from refine_engine import RefineResult
+
+
+def percentile(values: List[float], q: float) -> float:
+    """정렬된 값에서 q(0~1) 분위수를 선형 보간으로 구합니다."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def result_source(result: RefineResult) -> str:
+    """청크 결과가 어디서 왔는지 구분합니다."""
+    if result.resumed:
+        return "resumed"
+    if result.skipped:
+        return "prefilter"
+    if result.cached:
+        return "cache"
+    if result.deduplicated:
+        return "dedup"
+    return "api"
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LatencySample:
+    """지연 시간의 개수, 합계, 최댓값과 분위수 계산용 표본
+
+    표본은 max_size개까지 모두 두고, 넘으면 같은 확률로 뽑은 max_size개만 남깁니다(저수지 표본 추출).
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.values: List[float] = []
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.random = random.Random(0)
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self.values) < self.max_size:
+            self.values.append(value)
+        else:
+            slot = self.random.randrange(self.count)
+            if slot < self.max_size:
+                self.values[slot] = value
+
+    def percentile(self, q: float) -> float:
+        return percentile(sorted(self.values), q)
+
+
+class MetricsAggregate:
+    """기록을 하나씩 더해 가며 합계, 처리 단계별 통계, 지연 시간 분위수를 계산합니다."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.sources = {"api": 0, "cache": 0, "dedup": 0, "prefilter": 0, "resumed": 0}
+        self.rejected = 0
+        self.attempts = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.tiers: Dict[str, dict] = {}
+        self.latency = LatencySample()
+        self.first_token = LatencySample()
+
+    def add(self, record: dict):
+        self.chunks += 1
+        self.sources[record["source"]] += 1
+        self.rejected += record["rejected"]
+        self.input_tokens += record["input_tokens"]
+        self.output_tokens += record["output_tokens"]
+        self.cost += record["cost"]
+        if record["source"] == "api":
+            self.attempts += record["attempts"]
+            self.retries += max(record["attempts"] - 1, 0)
+            self.latency.add(record["latency"])
+            if record.get("first_token_latency") is not None:
+                self.first_token.add(record["first_token_latency"])
+        # 라우터가 고른 처리 단계별 청크 수, 요청 수, 비용 (이전 실행 결과를 이어 붙인 청크는 단계가 없음)
+        if record.get("tier") is not None:
+            tier = self.tiers.setdefault(record["tier"], {"chunks": 0, "requests": 0, "cost_usd": 0.0,
+                                                         "latency_sum": 0.0})
+            tier["chunks"] += 1
+            if record["source"] == "api":
+                tier["requests"] += 1
+                tier["latency_sum"] += record["latency"]
+            tier["cost_usd"] += record["cost"]
+
+    def summary(self, exchange_rate: float) -> dict:
+        return {
+            "chunks": self.chunks,
+            "sources": dict(self.sources),
+            "rejected": self.rejected,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": self.cost,
+            "cost_krw": self.cost * exchange_rate,
+            "tiers": {name: dict(tier) for name, tier in self.tiers.items()},
+            "latency": {
+                "p50": self.latency.percentile(0.50),
+                "p95": self.latency.percentile(0.95),
+                "p99": self.latency.percentile(0.99),
+                "max": self.latency.max,
+                "sum": self.latency.sum
+            },
+            # 스트리밍으로 받은 요청의 첫 조각까지 걸린 시간
+            "first_token": {
+                "count": self.first_token.count,
+                "p50": self.first_token.percentile(0.50),
+                "p95": self.first_token.percentile(0.95),
+                "max": self.first_token.max
+            }
+        }
+
+
+class MetricsRecorder:
+    """청크별 토큰, 지연 시간, 재시도, 비용을 기록하고 파일별, 실행 전체로 집계합니다.
+
+    비용은 API가 돌려준 실제 토큰 사용량으로 청크마다 계산한 값을 더하므로,
+    누적 비용을 청크마다 다시 더하던 방식과 달리 실행 전체 합계가 실제 사용량과 일치합니다.
+    집계는 기록할 때마다 파일별로 더해 두고, keep_records가 False이면(스트리밍 처리) 요청별 기록은 남기지 않아
+    메모리 사용량이 청크 수에 따라 늘지 않습니다.
+    """
+
+    def __init__(self, exchange_rate: float, keep_records: bool = True):
+        self.exchange_rate = exchange_rate
+        self.keep_records = keep_records
+        self.records: List[dict] = []
+        self.files: Dict[str, MetricsAggregate] = {}
+        self.overall = MetricsAggregate()
+        self.lock = threading.Lock()
+
+    def record(self, file: str, results: Iterable[RefineResult]):
+        records = [{
+            "file": file,
+            "index": result.index,
+            "source": result_source(result),
+            "tier": result.tier,
+            "model": result.model,
+            "input_tokens": result.input_tokens,
+            "output_tokens": result.output_tokens,
+            "attempts": result.attempts,
+            "latency": result.latency,
+            "first_token_latency": result.first_token_latency,
+            "cost": result.cost,
+            "rejected": result.rejected
+        } for result in results]
+        with self.lock:
+            for record in records:
+                self.files.setdefault(file, MetricsAggregate()).add(record)
+                self.overall.add(record)
+            if self.keep_records:
+                self.records.extend(records)
+
+    def summarize(self, records: List[dict]) -> dict:
+        """기록 목록의 합계와 API 요청 지연 시간 분위수를 계산합니다."""
+        aggregate = MetricsAggregate()
+        for record in records:
+            aggregate.add(record)
+        return aggregate.summary(self.exchange_rate)
+
+    def by_file(self) -> Dict[str, dict]:
+        with self.lock:
+            return {file: aggregate.summary(self.exchange_rate) for file, aggregate in self.files.items()}
+
+    def total(self) -> dict:
+        with self.lock:
+            return self.overall.summary(self.exchange_rate)
+
+    def to_json(self, include_requests: bool = True) -> str:
+        report = {"total": self.total(), "files": self.by_file()}
+        if include_requests and self.keep_records:
+            with self.lock:
+                report["requests"] = list(self.records)
+        return json.dumps(report, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """파일별 집계를 Prometheus 텍스트 형식으로 내보냅니다."""
+        files = self.by_file()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{escape_label(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        metric("refine_chunks_total", "counter", "Refined chunks by result source.",
+               [({"file": file, "source": source}, count)
+                for file, summary in files.items() for source, count in summary["sources"].items()])
+        metric("refine_rejected_total", "counter", "Chunks kept as original after retries were exhausted.",
+               [({"file": file}, summary["rejected"]) for file, summary in files.items()])
+        metric("refine_retries_total", "counter", "API retries after 429, timeout or 5xx responses.",
+               [({"file": file}, summary["retries"]) for file, summary in files.items()])
+        metric("refine_tokens_total", "counter", "Tokens reported by the API.",
+               [({"file": file, "direction": direction}, summary[f"{direction}_tokens"])
+                for file, summary in files.items() for direction in ("input", "output")])
+        metric("refine_cost_usd_total", "counter", "API cost in USD.",
+               [({"file": file}, f"{summary['cost_usd']:.8f}") for file, summary in files.items()])
+        metric("refine_tier_chunks_total", "counter", "Chunks by routing tier.",
+               [({"file": file, "tier": tier}, stat["chunks"])
+                for file, summary in files.items() for tier, stat in summary["tiers"].items()])
+        metric("refine_tier_requests_total", "counter", "API requests by routing tier.",
+               [({"file": file, "tier": tier}, stat["requests"])
+                for file, summary in files.items() for tier, stat in summary["tiers"].items()])
+        metric("refine_tier_cost_usd_total", "counter", "API cost in USD by routing tier.",
+               [({"file": file, "tier": tier}, f"{stat['cost_usd']:.8f}")
+                for file, summary in files.items() for tier, stat in summary["tiers"].items()])
+
+        lines.append("# HELP refine_request_latency_seconds API request latency including retries.")
+        lines.append("# TYPE refine_request_latency_seconds summary")
+        for file, summary in files.items():
+            label = f'file="{escape_label(file)}"'
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'refine_request_latency_seconds{{{label},quantile="0.{quantile[1:]}"}} '
+                             f'{summary["latency"][quantile]:.6f}')
+            lines.append(f'refine_request_latency_seconds_sum{{{label}}} {summary["latency"]["sum"]:.6f}')
+            lines.append(f'refine_request_latency_seconds_count{{{label}}} {summary["sources"]["api"]}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str, fmt: Optional[str] = None) -> str:
+        """집계 결과를 저장합니다. 형식을 지정하지 않으면 확장자가 .json이면 JSON, 그 외에는 Prometheus 형식입니다."""
+        if fmt is None:
+            fmt = "json" if path.endswith(".json") else "prometheus"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        content = self.to_json() if fmt == "json" else self.to_prometheus()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
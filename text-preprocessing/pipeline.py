@@ -0,0 +1,60 @@
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+def read_blocks(path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    """파일을 block_size 글자씩 읽습니다. 줄바꿈이 없는 전사 파일도 한 번에 메모리에 올리지 않습니다."""
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def stream_sentences(blocks: Iterable[str], tokenize: Callable[[str], List[str]],
+                     max_sentence_chars: Optional[int] = None) -> Iterator[str]:
+    """블록 단위로 문장을 분리합니다. 블록 끝에서 잘린 마지막 문장은 다음 블록과 이어 붙여 다시 분리합니다.
+    
+    문장부호가 없는 전사문은 이어 붙인 문장이 끝없이 길어져 블록마다 다시 분리하는 양도 늘어나므로,
+    max_sentence_chars를 넘으면 그 안의 마지막 공백에서 강제로 잘라 내보냅니다."""
+    carry = ""
+    for block in blocks:
+        text = carry + block
+        sentences = tokenize(text)
+        if not sentences:
+            carry = text
+        else:
+            # 마지막 문장은 원문 그대로(뒤쪽 공백 포함) 남겨야 다음 블록과 단어가 붙지 않는다
+            last = sentences[-1]
+            position = text.rfind(last)
+            carry = text[position:] if position >= 0 else last + " "
+            yield from sentences[:-1]
+        while max_sentence_chars and len(carry) > max_sentence_chars:
+            cut = max(carry.rfind(space, 1, max_sentence_chars + 1) for space in " \n\t")
+            if cut <= 0:
+                cut = max_sentence_chars
+            piece = carry[:cut].strip()
+            if piece:
+                yield piece
+            carry = carry[cut:].lstrip()
+    if carry.strip():
+        yield from tokenize(carry)
+
+
+def stream_chunks(sentences: Iterable[str], group_sentences: Callable[[List[str]], List[List[str]]],
+                  window: int = 64) -> Iterator[str]:
+    """window개 문장씩 병합합니다. 마지막 청크는 다음 문장들과 더 병합될 수 있으므로 그 문장들을 다음 창으로 넘깁니다.
+    
+    병합한 청크가 아니라 원래 문장을 넘기므로, 문장 내용으로 경계를 정하는 방식("stable")도
+    파일 전체를 한 번에 병합한 것과 같은 경계가 됩니다."""
+    buffer = []
+    for sentence in sentences:
+        buffer.append(sentence)
+        if len(buffer) >= window:
+            groups = group_sentences(buffer)
+            for group in groups[:-1]:
+                yield " ".join(group)
+            buffer = list(groups[-1]) if groups else []
+    if buffer:
+        for group in group_sentences(buffer):
+            yield " ".join(group)
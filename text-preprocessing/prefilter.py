@@ -0,0 +1,78 @@
+import re
+
+# 영어 간투사 ("mm-hmm"처럼 하이픈으로 이어진 단어의 일부는 제외)
+# 대소문자를 구분해 약어("ER", "HMM")를 남기고, 단위로 쓰일 수 있는 mm/er은 넣지 않으며 숫자 바로 뒤는 건너뛴다
+ENGLISH_FILLER = r'(?<!\d)(?<!\d\s)(?:[Uu]m+|[Uu]h+|[Ee]rm|[Aa]h+|[Hh]mm+|[Mm]mm+)(?![\w-])'
+# 항상 지워도 되는 간투사 (영어: um, uh... / 한국어: 음…, 어…)
+# 간투사만으로 된 문장("Um.")은 마침표까지 지우고, 문장 끝의 간투사("then ah.")는 마침표를 남긴다
+HARD_FILLERS = re.compile(
+    rf'(?:^|(?<=[.!?]\s)){ENGLISH_FILLER}[,.…]*\s*'
+    rf'|(?<!\S){ENGLISH_FILLER}(?:,|…|\.{{2,}})*\s*'
+    r'|(?<!\S)(?:음+|어+|아+|에+|그+|저+|뭐)\s*(?:…|\.{2,}|,)\s*'
+    r'|(?<!\S)(?:음+|어+)(?=\s)\s*'
+)
+# 문장 첫머리나 쉼표 뒤에서 쉼표와 함께 쓰인 담화 표지 (you know, / I mean, / basically,)
+# "Do you know, ..."처럼 문장 성분으로 쓰인 경우는 지우지 않는다
+DISCOURSE_FILLERS = re.compile(r'(?:^|(?<=[.!?,]\s))(?:you know|I mean|basically)\s*,\s*', re.IGNORECASE)
+# 문장 첫머리의 Well, / So, / Okay,
+LEADING_FILLERS = re.compile(r'(^|(?<=[.!?]\s))(?:well|so|okay|ok|alright)\s*,\s*', re.IGNORECASE)
+# 웃음
+LAUGHTER = re.compile(r',?\s*(?:아?하하+|ㅋㅋ+|ㅎㅎ+|(?:ha){2,})(?:\s*,)?(?=[\s.!?]|$)', re.IGNORECASE)
+# 말을 더듬은 조각 ("프로.. 프로세스" -> "프로세스", 숫자는 값이 바뀔 수 있으므로 제외)
+STUTTER = re.compile(r'(?<!\S)([^\W\d]+)(?:\.{2,}|…|-)\s+(?=\1)')
+# 문법상 두 번 쓰는 단어 ("had had", "that that")
+GRAMMATICAL_DOUBLES = ("had", "that")
+# 공백만 사이에 두고 연달아 반복한 단어 ("the the" -> "the")
+# 숫자("1, 1, 2"), 쉼표로 나뉜 반복("said so, so we"), 문법상 두 번 쓰는 단어는 남긴다
+REPEATED_WORD = re.compile(
+    rf'\b(?!(?:{"|".join(GRAMMATICAL_DOUBLES)})\b)([^\W\d]+)\s+(?=\1\b)', re.IGNORECASE
+)
+# 문장 중간에 남은 말줄임표
+ELLIPSIS = re.compile(r'\s*(?:\.{2,}|…)\s*(?=\S)')
+SPACE_BEFORE_PUNCT = re.compile(r'\s+([,.!?])')
+DUPLICATE_COMMA = re.compile(r',\s*(?=[,.!?])|(?<=[.!?]),')
+LEADING_PUNCT = re.compile(r'^[\s,]+')
+MULTI_SPACE = re.compile(r'[ \t]{2,}')
+
+# 로컬 정제 후에도 남아 있으면 AI가 다듬어야 하는 표현 (쉼표 없이 쓴 담화 표지, 문장 첫머리의 So/Well 포함)
+SOFT_MARKERS = re.compile(
+    r'\b(?:like|actually|kind of|sort of|right\?|literally|so yeah|you see|basically|you know|I mean)\b'
+    r'|(?:^|(?<=[.!?]\s))(?:so|well|okay|ok|alright|now)\b'
+    r'|(?<!\S)(?:그러니까|이제|약간|막|그냥|좀|사실|뭐랄까)(?!\S)',
+    re.IGNORECASE
+)
+
+
+class FillerFilter:
+    """API 호출 전에 간투사, 웃음, 말더듬, 반복 단어를 로컬에서 지우는 규칙 기반 필터"""
+
+    def __init__(self, max_marker_density: float = 0.0):
+        self.max_marker_density = max_marker_density
+        self.chars_removed = 0
+
+    def clean(self, text: str) -> str:
+        """간투사와 반복을 지운 문장을 반환합니다."""
+        cleaned = HARD_FILLERS.sub('', text.strip())
+        cleaned = DISCOURSE_FILLERS.sub('', cleaned)
+        cleaned = LEADING_FILLERS.sub(r'\1', cleaned)
+        cleaned = LAUGHTER.sub('', cleaned)
+        cleaned = STUTTER.sub('', cleaned)
+        cleaned = REPEATED_WORD.sub('', cleaned)
+        cleaned = ELLIPSIS.sub(' ', cleaned)
+        cleaned = SPACE_BEFORE_PUNCT.sub(r'\1', cleaned)
+        cleaned = DUPLICATE_COMMA.sub('', cleaned)
+        cleaned = LEADING_PUNCT.sub('', cleaned)
+        cleaned = MULTI_SPACE.sub(' ', cleaned).strip()
+        # 지운 간투사 뒤에 오던 문장 첫 글자를 대문자로
+        cleaned = re.sub(r'(^|[.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), cleaned)
+
+        self.chars_removed += len(text) - len(cleaned)
+        return cleaned
+
+    def needs_refinement(self, text: str) -> bool:
+        """로컬 정제 후에도 AI가 다듬어야 할 표현이 남아 있는지 확인합니다."""
+        words = len(text.split())
+        if words == 0:
+            return False
+        markers = len(SOFT_MARKERS.findall(text))
+        return markers / words > self.max_marker_density
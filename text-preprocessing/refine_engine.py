@@ -0,0 +1,298 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from scheduler import RequestRejectedError, RequestScheduler
+from tokenizer import estimate_tokens
+
+if TYPE_CHECKING:
+    # 타입 표시에만 사용 (openai는 클라이언트를 만들 때 불러온다)
+    from openai import AsyncOpenAI
+
+# 여러 청크를 한 번에 보낼 때 시스템 프롬프트 뒤에 붙이는 응답 형식 안내
+BATCH_INSTRUCTION = (
+    " The user message is a JSON object {\"chunks\": [{\"id\": <int>, \"text\": <string>}, ...]}."
+    " Refine each chunk's text independently and reply only with a JSON object of the same shape,"
+    " containing every id exactly once, in the same order, with the refined text."
+)
+# 앞 청크의 끝부분을 읽기 전용 문맥으로 함께 보낼 때 붙이는 안내
+CONTEXT_INSTRUCTION = (
+    "The previous part of the lecture ended with: \"{context}\"\n"
+    "Use it only to resolve references at the start of the text. Do not refine, repeat or include it in your reply."
+)
+BATCH_CONTEXT_INSTRUCTION = (
+    " A chunk may have a \"context\" field with the end of the preceding lecture text."
+    " Use it only to resolve references and never include it in the reply."
+)
+
+
+@dataclass
+class RefineResult:
+    """단일 문장 정제 결과"""
+    index: int
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    attempts: int = 0
+    cost: float = 0.0
+    cached: bool = False
+    resumed: bool = False
+    skipped: bool = False
+    deduplicated: bool = False
+    # 정제에 사용한 모델과 처리 단계 (모델을 거치지 않았으면 model은 None)
+    model: Optional[str] = None
+    tier: Optional[str] = None
+    latency: float = 0.0
+    first_token_latency: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def rejected(self) -> bool:
+        return self.error is not None
+
+
+@dataclass
+class StreamedCompletion:
+    """스트리밍 응답을 모두 받아 합친 결과"""
+    content: str
+    usage: Any
+    first_token_at: Optional[float]
+
+
+# 스트리밍 중 받은 조각을 전달하는 콜백 (청크 번호, 조각). 재시도로 처음부터 다시 받을 때는 조각이 None
+TokenCallback = Callable[[int, Optional[str]], None]
+
+
+class AsyncRefineEngine:
+    def __init__(self, client: "AsyncOpenAI", scheduler: RequestScheduler, model: str, temperature: float,
+                 system_prompt: str, max_concurrency: int = 8, batch_size: int = 1, batch_max_tokens: int = 2000):
+        self.client = client
+        self.scheduler = scheduler
+        self.model = model
+        self.temperature = temperature
+        self.system_prompt = system_prompt
+        self.batch_size = batch_size
+        self.batch_max_tokens = batch_max_tokens
+        # 동시에 진행되는 API 요청 수 제한
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def build_messages(self, sentence: str, context: Optional[str] = None) -> List[dict]:
+        """API 요청 메시지를 생성합니다. context가 있으면 정제 대상이 아닌 참고 문맥으로 넣습니다."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if context:
+            messages.append({"role": "system", "content": CONTEXT_INSTRUCTION.format(context=context)})
+        messages.append({"role": "user", "content": sentence})
+        return messages
+
+    async def stream_completion(self, index: int, messages: List[dict], on_token: TokenCallback,
+                                model: str) -> StreamedCompletion:
+        """응답을 스트리밍으로 받으며 조각마다 on_token을 호출하고, 다 받으면 합친 결과를 반환합니다."""
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=self.temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        # 재시도라면 앞서 보여준 조각을 지우도록 알린다
+        on_token(index, None)
+        parts = []
+        usage = None
+        first_token_at = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+                on_token(index, chunk.choices[0].delta.content)
+        return StreamedCompletion("".join(parts), usage, first_token_at)
+
+    async def refine(self, index: int, sentence: str, on_token: Optional[TokenCallback] = None,
+                     model: Optional[str] = None, context: Optional[str] = None) -> RefineResult:
+        """단일 문장을 비동기로 정제합니다. 끝내 실패한 문장은 원문을 유지하고 오류를 기록합니다.
+        on_token을 넘기면 응답을 스트리밍으로 받고 첫 조각까지 걸린 시간을 기록합니다.
+        model을 넘기면 기본 모델 대신 그 모델로 요청하고, context는 참고 문맥으로 함께 보냅니다."""
+        model = model or self.model
+        messages = self.build_messages(sentence, context)
+        prompt = "".join(message["content"] for message in messages)
+        estimated = estimate_tokens(prompt) + estimate_tokens(sentence)
+
+        async with self.semaphore:
+            # 지연 시간은 동시 요청 대기를 제외하고 재시도와 한도 대기를 포함해 측정
+            start = time.perf_counter()
+            try:
+                if on_token:
+                    response, attempts = await self.scheduler.submit(
+                        lambda: self.stream_completion(index, messages, on_token, model), estimated
+                    )
+                else:
+                    response, attempts = await self.scheduler.submit(
+                        lambda: self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=self.temperature
+                        ),
+                        estimated
+                    )
+            except RequestRejectedError as e:
+                return RefineResult(index, sentence, attempts=e.attempts, model=model, error=str(e),
+                                    latency=time.perf_counter() - start)
+            latency = time.perf_counter() - start
+
+        if on_token:
+            # 사용량을 보내지 않는 서버에서는 추정값을 사용
+            usage = response.usage
+            return RefineResult(
+                index,
+                response.content.strip(),
+                input_tokens=usage.prompt_tokens if usage else estimate_tokens(prompt),
+                output_tokens=usage.completion_tokens if usage else estimate_tokens(response.content),
+                attempts=attempts,
+                model=model,
+                latency=latency,
+                first_token_latency=response.first_token_at - start if response.first_token_at else None
+            )
+        return RefineResult(
+            index,
+            response.choices[0].message.content.strip(),
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            attempts=attempts,
+            model=model,
+            latency=latency
+        )
+
+    async def refine_batch(self, items: List[Tuple[int, str]], model: Optional[str] = None,
+                           contexts: Optional[Dict[int, str]] = None) -> List[RefineResult]:
+        """여러 문장을 한 번의 요청으로 정제합니다. 응답의 개수나 순서가 맞지 않으면 문장별 요청으로 다시 처리합니다.
+        contexts는 {문장 번호: 참고 문맥}입니다."""
+        model = model or self.model
+        contexts = contexts or {}
+        if len(items) == 1:
+            return [await self.refine(*items[0], model=model, context=contexts.get(items[0][0]))]
+
+        system_prompt = self.system_prompt + BATCH_INSTRUCTION
+        chunks = []
+        for index, sentence in items:
+            chunk = {"id": index, "text": sentence}
+            if contexts.get(index):
+                chunk["context"] = contexts[index]
+            chunks.append(chunk)
+        if any("context" in chunk for chunk in chunks):
+            system_prompt += BATCH_CONTEXT_INSTRUCTION
+        payload = json.dumps({"chunks": chunks}, ensure_ascii=False)
+        estimated = estimate_tokens(system_prompt + payload) + estimate_tokens(payload)
+
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                response, attempts = await self.scheduler.submit(
+                    lambda: self.client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": payload}
+                        ],
+                        temperature=self.temperature,
+                        response_format={"type": "json_object"}
+                    ),
+                    estimated
+                )
+            except RequestRejectedError as e:
+                latency = time.perf_counter() - start
+                return [RefineResult(index, sentence, attempts=e.attempts, model=model, error=str(e), latency=latency)
+                        for index, sentence in items]
+            latency = time.perf_counter() - start
+
+        texts = self.parse_batch_response(response.choices[0].message.content, [index for index, _ in items])
+        if texts is None:
+            # 응답이 깨졌을 때는 이미 사용한 토큰을 첫 결과에 기록하고 문장별로 다시 요청
+            results = list(await asyncio.gather(*(self.refine(index, sentence, model=model,
+                                                              context=contexts.get(index))
+                                                  for index, sentence in items)))
+            results[0].input_tokens += response.usage.prompt_tokens
+            results[0].output_tokens += response.usage.completion_tokens
+            results[0].latency += latency
+            return results
+
+        # 토큰 사용량은 문장 길이 비율로 나누어 기록
+        total_length = sum(len(sentence) for _, sentence in items) or 1
+        results = []
+        for (index, sentence), text in zip(items, texts):
+            share = len(sentence) / total_length
+            results.append(RefineResult(
+                index,
+                text,
+                input_tokens=round(response.usage.prompt_tokens * share),
+                output_tokens=round(response.usage.completion_tokens * share),
+                attempts=attempts,
+                model=model,
+                latency=latency
+            ))
+        return results
+
+    @staticmethod
+    def parse_batch_response(content: str, expected_ids: List[int]) -> Optional[List[str]]:
+        """배치 응답에서 문장별 결과를 꺼냅니다. id의 개수와 순서가 요청과 다르면 None을 반환합니다."""
+        try:
+            chunks = json.loads(content)["chunks"]
+            ids = [chunk["id"] for chunk in chunks]
+            texts = [chunk["text"].strip() for chunk in chunks]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if ids != expected_ids or not all(texts):
+            return None
+        return texts
+
+    def make_batches(self, items: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """연속된 문장을 batch_size개, batch_max_tokens 토큰 이하로 묶습니다."""
+        batches = []
+        current = []
+        current_tokens = 0
+        for index, sentence in items:
+            tokens = estimate_tokens(sentence)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.batch_max_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append((index, sentence))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def refine_all(self, sentences: List[str],
+                         on_result: Optional[Callable[[RefineResult], None]] = None,
+                         indices: Optional[List[int]] = None,
+                         on_token: Optional[TokenCallback] = None,
+                         model: Optional[str] = None,
+                         contexts: Optional[List[Optional[str]]] = None) -> List[RefineResult]:
+        """모든 문장을 동시에 정제하고 입력 순서대로 결과를 반환합니다. indices로 결과의 문장 번호를 지정할 수 있습니다.
+        on_token을 넘기면 문장별로 응답을 스트리밍합니다. (묶음 요청은 JSON 응답이라 사용하지 않음)
+        model을 넘기면 기본 모델 대신 그 모델로 요청하고, contexts는 문장별 참고 문맥입니다.
+        문맥은 서로의 정제 결과에 의존하지 않으므로 모든 요청을 동시에 보냅니다."""
+        if indices is None:
+            indices = list(range(len(sentences)))
+        items = list(zip(indices, sentences))
+        context_of = {index: context for index, context in zip(indices, contexts) if context} if contexts else {}
+
+        batching = self.batch_size > 1 and on_token is None
+
+        async def run(batch: List[Tuple[int, str]]) -> List[RefineResult]:
+            if batching:
+                results = await self.refine_batch(batch, model, context_of)
+            else:
+                results = [await self.refine(*batch[0], on_token=on_token, model=model,
+                                             context=context_of.get(batch[0][0]))]
+            if on_result:
+                for result in results:
+                    on_result(result)
+            return results
+
+        batches = self.make_batches(items) if batching else [[item] for item in items]
+        # gather는 완료 순서와 관계없이 입력 순서대로 결과를 돌려준다
+        return [result for results in await asyncio.gather(*(run(batch) for batch in batches)) for result in results]
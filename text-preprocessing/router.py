@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from prefilter import SOFT_MARKERS, FillerFilter
+
+
+@dataclass
+class Route:
+    """청크 하나를 처리할 단계"""
+    tier: str
+    # 모델에 보낼 문장 (로컬 정제를 거친 문장)
+    text: str
+    # None이면 API를 호출하지 않고 text를 결과로 사용
+    model: Optional[str] = None
+
+
+class ModelRouter:
+    """청크마다 구어 표현 점수를 계산해 처리 단계를 고릅니다.
+
+    로컬 정제만으로 충분한 청크는 "skip"(지울 것이 없음)이나 "local"(규칙 기반 정제만)로 끝내고,
+    나머지는 점수가 max_score 이하인 첫 단계의 모델로 보냅니다. allow_local이 False이면 모든 청크를 모델로 보내고
+    로컬 정제는 보내는 문장을 줄이는 데만 씁니다. 점수는 로컬 정제 후 남은 구어 표현 비율과
+    로컬 정제로 지운 글자 비율(간투사, 말더듬, 반복)의 합이고, 단어 수가 적은 청크는 가장 싼 단계로 보냅니다.
+    """
+
+    def __init__(self, tiers: Dict[str, dict], prefilter: Optional[FillerFilter] = None, short_chunk_words: int = 0,
+                 allow_local: bool = False):
+        if not tiers:
+            raise ValueError("모델 단계가 하나 이상 필요합니다")
+        # max_score가 낮은 단계부터 확인하고, max_score가 None인 단계는 나머지 전부를 맡는다
+        self.tiers = sorted(tiers.items(), key=lambda item: float('inf') if item[1].get("max_score") is None
+                            else item[1]["max_score"])
+        self.prefilter = prefilter
+        self.short_chunk_words = short_chunk_words
+        self.allow_local = allow_local
+
+    @property
+    def models(self) -> List[str]:
+        return [tier["model"] for _, tier in self.tiers]
+
+    @staticmethod
+    def score(original: str, cleaned: str) -> float:
+        words = len(cleaned.split())
+        if words == 0:
+            return 0.0
+        markers = len(SOFT_MARKERS.findall(cleaned)) / words
+        original = original.strip()
+        removed = max(len(original) - len(cleaned), 0) / max(len(original), 1)
+        return markers + removed
+
+    def route(self, text: str) -> Route:
+        if self.prefilter:
+            cleaned = self.prefilter.clean(text)
+            if self.allow_local and not self.prefilter.needs_refinement(cleaned):
+                return Route("skip" if cleaned == text.strip() else "local", cleaned)
+        else:
+            cleaned = text
+
+        if len(cleaned.split()) < self.short_chunk_words:
+            name, tier = self.tiers[0]
+        else:
+            score = self.score(text, cleaned)
+            name, tier = next(((name, tier) for name, tier in self.tiers
+                               if tier.get("max_score") is None or score <= tier["max_score"]), self.tiers[-1])
+        return Route(name, cleaned, tier["model"])
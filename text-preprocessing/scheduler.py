@@ -0,0 +1,160 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+
+class RequestRejectedError(Exception):
+    """재시도 후에도 처리하지 못한 요청"""
+
+    def __init__(self, message: str, attempts: int):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class TokenBucket:
+    """분당 한도를 초 단위로 채워 나가는 토큰 버킷"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.available = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """amount만큼 예약하고 사용 가능해질 때까지 기다려야 하는 시간(초)을 반환합니다."""
+        self.refill(now)
+        # 한도보다 큰 요청이 영원히 대기하지 않도록 제한
+        self.available -= min(amount, self.capacity)
+        if self.available >= 0:
+            return 0.0
+        return -self.available / self.rate
+
+    def refund(self, amount: float):
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    """분당 요청 수(RPM)와 분당 토큰 수(TPM) 한도를 함께 관리합니다."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+
+    async def acquire(self, tokens: int):
+        """요청 1건과 tokens만큼의 예산을 예약하고 사용 가능할 때까지 기다립니다."""
+        # 예약은 await 없이 즉시 이루어지므로 먼저 도착한 요청이 먼저 처리된다
+        now = time.monotonic()
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens, now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        # 대기 중에 429로 전체 일시 정지가 걸렸다면 추가로 기다린다
+        while (delay := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def reconcile(self, estimated: int, actual: int):
+        """추정 토큰 수와 실제 사용량의 차이를 TPM 예산에 반영합니다."""
+        if self.tokens:
+            self.tokens.refund(estimated - actual)
+
+    def pause(self, seconds: float):
+        """429 응답을 받으면 모든 요청을 잠시 멈춥니다."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def is_retryable(error: Exception) -> bool:
+    """재시도로 해결될 수 있는 오류인지 확인합니다."""
+    # openai는 불러오는 데 오래 걸리므로 요청을 보낸 뒤(이미 불러온 뒤)에만 가져온다
+    from openai import APIConnectionError, APIStatusError
+    if isinstance(error, (asyncio.TimeoutError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """응답의 Retry-After 헤더에서 대기 시간(초)을 읽습니다."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+        # HTTP 날짜 형식
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return "요청 시간 초과"
+    return f"{type(error).__name__}: {error}"
+
+
+class RequestScheduler:
+    def __init__(self, limiter: RateLimiter, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0, timeout: float = 60.0):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """지터가 적용된 지수 백오프 대기 시간을 계산합니다. Retry-After가 더 길면 그 값을 따릅니다."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def submit(self, make_request: Callable[[], Awaitable[Any]], estimated_tokens: int) -> Tuple[Any, int]:
+        """예산 안에서 요청을 실행하고 (응답, 시도 횟수)를 반환합니다. 끝내 실패하면 RequestRejectedError를 발생시킵니다."""
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.acquire(estimated_tokens)
+            try:
+                response = await asyncio.wait_for(make_request(), timeout=self.timeout)
+            except Exception as e:
+                if not is_retryable(e) or attempt > self.max_retries:
+                    raise RequestRejectedError(describe_error(e), attempt) from e
+
+                delay = self.backoff_delay(attempt, get_retry_after(e))
+                from openai import RateLimitError
+                if isinstance(e, RateLimitError):
+                    # 한도 초과는 다른 요청에도 영향을 주므로 전체를 멈춘다
+                    self.limiter.pause(delay)
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.limiter.reconcile(estimated_tokens, usage.total_tokens)
+            return response, attempt
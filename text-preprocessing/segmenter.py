@@ -0,0 +1,176 @@
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional
+
+
+class Segmenter(ABC):
+    """텍스트를 문장 목록으로 나누는 백엔드의 공통 인터페이스"""
+
+    name = "base"
+
+    @abstractmethod
+    def tokenize(self, text: str) -> List[str]:
+        """text를 문장 목록으로 나눕니다."""
+
+
+class PunktSegmenter(Segmenter):
+    """NLTK Punkt 모델을 프로세스당 한 번만 불러와 재사용합니다."""
+
+    name = "punkt"
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.tokenizer = load_punkt(data_dir)
+
+    def tokenize(self, text: str) -> List[str]:
+        return self.tokenizer.tokenize(text)
+
+
+def punkt_resource():
+    """설치된 nltk 버전에 맞는 Punkt 자료의 (경로, 패키지 이름, 분리기 생성 함수)"""
+    import nltk
+    try:
+        # nltk 3.8.2 이상은 pickle 대신 punkt_tab 형식을 사용
+        from nltk.tokenize import PunktTokenizer
+        return 'tokenizers/punkt_tab/english/', 'punkt_tab', lambda: PunktTokenizer('english')
+    except ImportError:
+        return 'tokenizers/punkt', 'punkt', lambda: nltk.data.load('tokenizers/punkt/english.pickle')
+
+
+def punkt_available(data_dir: Optional[str] = None) -> bool:
+    """data_dir 또는 nltk 기본 경로에 Punkt 자료가 있는지 확인합니다."""
+    import nltk
+    if data_dir:
+        data_dir = os.path.abspath(data_dir)
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+    try:
+        nltk.data.find(punkt_resource()[0])
+        return True
+    except LookupError:
+        return False
+
+
+def load_punkt(data_dir: Optional[str] = None):
+    """Punkt 모델을 불러옵니다. data_dir를 먼저 찾고, 어디에도 없으면 내려받지 않고 오류를 냅니다.
+
+    자료가 없을 때 regex로 바꾸는 처리는 available_segmenter()가 부모 프로세스에서 합니다."""
+    _, package, create = punkt_resource()
+    if not punkt_available(data_dir):
+        raise LookupError(f"Punkt 자료({package})가 없습니다. 'python text-preprocessing/segmenter.py --download'로 "
+                          f"먼저 받아 두거나 SEGMENTER를 'regex'로 설정하세요.")
+    return create()
+
+
+def download_punkt(data_dir: str) -> str:
+    """Punkt 자료를 data_dir에 내려받아 이후 실행에서 네트워크 없이 쓰도록 합니다."""
+    import nltk
+    _, package, _ = punkt_resource()
+    os.makedirs(data_dir, exist_ok=True)
+    if not nltk.download(package, download_dir=data_dir, quiet=True, print_error_to=sys.stderr):
+        raise RuntimeError(f"Punkt 자료({package})를 내려받지 못했습니다.")
+    return os.path.join(data_dir, "tokenizers", package)
+
+
+class RegexSegmenter(Segmenter):
+    """강의 전사문에 맞춘 규칙 기반 분리기
+
+    문장부호(. ! ? 。) 뒤의 공백과, 문장부호 없이 끝나는 한국어 종결 어미(~니다, ~요, ~죠 등) 뒤의
+    공백을 문장 경계로 봅니다. 말을 끄는 말줄임표(.. … 등)와 약어(Mr., e.g. 등), 이니셜(J. Smith)
+    뒤에서는 나누지 않습니다.
+    """
+
+    name = "regex"
+
+    BOUNDARY = re.compile(
+        r'(?:(?:[!?。]+|(?<!\.)\.(?!\.))["\'”’)\]]*'
+        # ~요: 어/아/여/해요와 모음이 줄어든 형태(배워요, 봐요, 돼요, 줘요, 가져요, 할게요 등).
+        # '필요', '주요', '개요'처럼 요로 끝나는 명사는 나누지 않도록 어미를 나열한다
+        r'|(?:니다|[어아여해워와봐돼줘가서져려쳐켜혀펴겨셔대래내게지]요|에요|예요|죠|네요|군요|거든요|까요|세요|데요|나요)(?=\s))'
+        r'\s+'
+    )
+    ABBREVIATIONS = {
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "fig", "approx", "cf"
+    }
+
+    def tokenize(self, text: str) -> List[str]:
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(text):
+            if self.is_abbreviation(text, match.start()):
+                continue
+            sentence = text[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        rest = text[start:].strip()
+        if rest:
+            sentences.append(rest)
+        return sentences
+
+    def is_abbreviation(self, text: str, end: int) -> bool:
+        """경계 직전 단어가 약어나 이니셜인지 확인합니다."""
+        if end >= len(text) or text[end] != '.':
+            return False
+        word_start = max(text.rfind(' ', 0, end), text.rfind('\n', 0, end)) + 1
+        word = text[word_start:end].lower()
+        return word in self.ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+SEGMENTERS = {
+    PunktSegmenter.name: PunktSegmenter,
+    RegexSegmenter.name: RegexSegmenter,
+}
+
+
+@lru_cache(maxsize=None)
+def available_segmenter(name: str, data_dir: Optional[str] = None) -> str:
+    """name 분리기를 쓸 수 있으면 name을 반환합니다.
+
+    실행 중에는 네트워크를 쓰지 않습니다. Punkt 자료가 data_dir와 nltk 기본 경로 어디에도 없으면 경고를
+    한 번 출력하고 'regex'를 반환합니다. 자료는 'segmenter.py --download'로 미리 받아 둡니다.
+    프로세스 풀을 만들기 전에 부모 프로세스에서 호출하면 작업자는 결과를 물려받습니다."""
+    if name != PunktSegmenter.name or punkt_available(data_dir):
+        return name
+    print(f"경고: Punkt 자료가 없어 규칙 기반 분리기(regex)를 사용합니다. "
+          f"'python text-preprocessing/segmenter.py --download'로 {data_dir or 'nltk 기본 경로'}에 "
+          f"받아 두면 Punkt를 사용합니다.")
+    return RegexSegmenter.name
+
+
+@lru_cache(maxsize=None)
+def get_segmenter(name: str, data_dir: Optional[str] = None) -> Segmenter:
+    """이름에 해당하는 분리기를 반환합니다. 같은 프로세스에서는 한 번 만든 분리기를 재사용합니다.
+    data_dir는 Punkt 자료를 먼저 찾을 디렉토리입니다."""
+    if name not in SEGMENTERS:
+        raise ValueError(f"지원하지 않는 문장 분리기입니다: {name} (사용 가능: {', '.join(SEGMENTERS)})")
+    if name == PunktSegmenter.name:
+        return PunktSegmenter(data_dir)
+    return SEGMENTERS[name]()
+
+
+def trailing_context(text: str, sentences: int, max_chars: int) -> str:
+    """text의 마지막 sentences개 문장을 반환합니다. max_chars자를 넘으면 앞쪽을 단어 단위로 자릅니다."""
+    if sentences <= 0 or not text:
+        return ""
+    # 청크 끝부분만 나누면 되므로 Punkt 대신 규칙 기반 분리기를 사용
+    tail = " ".join(get_segmenter(RegexSegmenter.name).tokenize(text[-max_chars * 2:])[-sentences:])
+    if len(tail) > max_chars:
+        tail = tail[-max_chars:]
+        tail = tail.split(" ", 1)[1] if " " in tail else tail
+    return tail
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="문장 분리기 자료 관리")
+    parser.add_argument("--download", action="store_true", help="Punkt 자료를 미리 내려받습니다")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data"),
+                        help="Punkt 자료를 저장할 디렉토리 (기본값: text-preprocessing/nltk_data)")
+    args = parser.parse_args()
+    if args.download:
+        print(f"Punkt 자료를 저장했습니다: {download_punkt(args.data_dir)}")
+    else:
+        parser.print_help()
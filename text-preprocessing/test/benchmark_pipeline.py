@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+# text-preprocessing 폴더의 모듈을 불러오기 위한 경로 설정
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from main import Config, FileManager, TextProcessor, process_file, stream_files
+from benchmark_segmenter import load_corpora
+from mock_openai_server import MockOpenAIServer
+from tokenizer import estimate_tokens
+
+# 측정할 처리 방식별 Config 설정
+MODES = {
+    "chars": {"PACKING_MODE": "chars"},
+    "tokens": {"PACKING_MODE": "tokens"},
+    "batch": {"BATCH_SIZE": 8},
+    "stream": {},
+}
+
+
+def apply_config(overrides: dict) -> dict:
+    """Config 값을 바꾸고 원래 값을 반환합니다."""
+    previous = {key: getattr(Config, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(Config, key, value)
+    return previous
+
+
+def run_once(mode: str, path: str, output_dir: str) -> dict:
+    """한 말뭉치를 한 가지 방식으로 분리, 병합, 정제하고 처리량과 메모리 사용량을 측정합니다."""
+    processor = TextProcessor()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "stream":
+        stat = asyncio.run(stream_files(processor, [path], FileManager(output_dir)))[path]
+        chunks = stat["chunks"]
+        chunk_tokens = None
+    else:
+        sentences = process_file(path)
+        chunks = len(sentences)
+        refined = processor.process_sentences(sentences, source=os.path.basename(path))
+        # 사전 정제나 캐시로 끝난 청크는 요청에 포함되지 않으므로 API로 보낸 청크만 센다
+        chunk_tokens = sum(estimate_tokens(sentence) for sentence, result in zip(sentences, refined)
+                           if not (result.skipped or result.cached or result.resumed))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = processor.metrics.total()
+    billed = summary["input_tokens"] + summary["output_tokens"]
+    return {
+        "chunks": chunks,
+        "seconds": elapsed,
+        "chunks_per_second": chunks / elapsed if elapsed > 0 else 0.0,
+        "api_chunks": summary["sources"]["api"],
+        "retries": summary["retries"],
+        "rejected": summary["rejected"],
+        "latency": summary["latency"],
+        "input_tokens": summary["input_tokens"],
+        "output_tokens": summary["output_tokens"],
+        # 청구된 입력 토큰 중 전사문 내용이 차지하는 비율 (나머지는 시스템 프롬프트 등 요청마다 반복되는 부분)
+        "token_efficiency": (chunk_tokens / summary["input_tokens"]
+                             if chunk_tokens and summary["input_tokens"] else None),
+        "tokens_per_chunk": billed / summary["sources"]["api"] if summary["sources"]["api"] else 0.0,
+        "peak_memory_mb": peak / 1024 / 1024,
+        "cost_usd": summary["cost_usd"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock 서버를 상대로 문장 분리부터 AI 정제까지의 처리량 측정")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1, 10], help="합성 말뭉치 반복 횟수 (기본값: 1 10)")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES), help="측정할 처리 방식")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock 서버 응답 지연 시간 (초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.02, help="응답 지연 시간의 무작위 편차 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock 서버가 429를 돌려줄 확률 (0~1)")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Mock 서버의 분당 최대 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--concurrency", type=int, default=Config.MAX_CONCURRENT_REQUESTS, help="최대 동시 요청 수")
+    parser.add_argument("--segmenter", default="regex", help="문장 분리기 (기본값: regex)")
+    parser.add_argument("--no-prefilter", action="store_true", help="로컬 사전 정제 없이 모든 청크를 API로 보냅니다")
+    parser.add_argument("--json", default=None, help="측정 결과를 저장할 JSON 파일 (회귀 비교용)")
+    args = parser.parse_args()
+
+    # 캐시와 유사 청크 재사용은 반복 측정 결과를 왜곡하므로 끈다
+    # 체크포인트는 모든 청크가 끝나면 지워지므로 기본 설정처럼 켜 두고 메모리 사용량에 포함한다
+    base = {
+        "SEGMENTER": args.segmenter,
+        "MAX_CONCURRENT_REQUESTS": args.concurrency,
+        "CACHE_ENABLED": False,
+        "DEDUP_ENABLED": False,
+        "CHECKPOINT_ENABLED": True,
+        "RETRY_BASE_DELAY": 0.1,
+    }
+    if args.no_prefilter:
+        base["PREFILTER_ENABLED"] = False
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    corpora = load_corpora([size for size in args.sizes if size > 1])
+    results: List[dict] = []
+    with tempfile.TemporaryDirectory() as work_dir, \
+            MockOpenAIServer(latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+                             retry_after=0.1, rpm_limit=args.rpm_limit) as server:
+        base["OPENAI_BASE_URL"] = server.base_url
+        base["CHECKPOINT_DIR"] = os.path.join(work_dir, "checkpoints")
+        previous = apply_config(base)
+        try:
+            # 첫 요청의 지연 import와 연결 생성 시간이 측정에 섞이지 않도록 한 번 미리 실행
+            warmup_path = os.path.join(work_dir, "warmup.txt")
+            with open(warmup_path, 'w', encoding='utf-8') as f:
+                f.write(next(iter(corpora.values())))
+            run_once("chars", warmup_path, work_dir)
+            print(f"{'말뭉치':<22} {'방식':<7} {'청크':>6} {'요청':>6} {'429':>5} {'초':>7} {'청크/초':>8} "
+                  f"{'p50':>6} {'p95':>6} {'p99':>6} {'메모리MB':>9} {'토큰효율':>8}")
+            for corpus_name, text in corpora.items():
+                path = os.path.join(work_dir, f"corpus_{len(results)}.txt")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                for mode in args.modes:
+                    requests_before, errors_before = server.request_count, server.error_count
+                    mode_previous = apply_config(MODES[mode])
+                    try:
+                        result = run_once(mode, path, work_dir)
+                    finally:
+                        apply_config(mode_previous)
+                    result.update(corpus=corpus_name, mode=mode, size_kb=len(text.encode('utf-8')) / 1024,
+                                  requests=server.request_count - requests_before,
+                                  rate_limited=server.error_count - errors_before)
+                    results.append(result)
+                    latency = result["latency"]
+                    efficiency = f"{result['token_efficiency']:.2f}" if result["token_efficiency"] else "-"
+                    print(f"{corpus_name:<22} {mode:<7} {result['chunks']:>6} {result['requests']:>6} "
+                          f"{result['rate_limited']:>5} {result['seconds']:>7.2f} {result['chunks_per_second']:>8.1f} "
+                          f"{latency['p50']:>6.2f} {latency['p95']:>6.2f} {latency['p99']:>6.2f} "
+                          f"{result['peak_memory_mb']:>9.1f} {efficiency:>8}")
+        finally:
+            apply_config(previous)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n측정 결과를 저장했습니다: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import time
+from typing import List, Set
+
+# text-preprocessing 폴더의 모듈을 불러오기 위한 경로 설정
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from segmenter import SEGMENTERS, get_segmenter
+
+
+def boundary_offsets(text: str, sentences: List[str]) -> Set[int]:
+    """분리된 문장이 원문에서 끝나는 위치(문장 경계)의 집합을 구합니다."""
+    offsets = set()
+    position = 0
+    for sentence in sentences:
+        found = text.find(sentence, position)
+        if found < 0:
+            continue
+        position = found + len(sentence)
+        offsets.add(position)
+    # 마지막 문장의 끝은 항상 경계이므로 비교에서 제외
+    offsets.discard(position)
+    return offsets
+
+
+def agreement(reference: Set[int], predicted: Set[int]) -> dict:
+    """기준 분리기와의 경계 일치도(정밀도, 재현율, F1)를 계산합니다."""
+    matched = len(reference & predicted)
+    precision = matched / len(predicted) if predicted else 1.0
+    recall = matched / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def load_corpora(sizes: List[int]) -> dict:
+    """assets/lecture1.txt와 testData.txt, 그리고 이를 반복해 만든 큰 합성 말뭉치를 준비합니다."""
+    assets_dir = os.path.join(os.path.dirname(os.path.dirname(current_dir)), 'assets')
+    with open(os.path.join(assets_dir, 'lecture1.txt'), 'r', encoding='utf-8') as f:
+        lecture = f.read()
+    with open(os.path.join(current_dir, 'testData.txt'), 'r', encoding='utf-8') as f:
+        korean = f.read()
+
+    corpora = {"lecture1.txt": lecture, "testData.txt (한국어)": korean}
+    for size in sizes:
+        if size > 1:
+            corpora[f"합성 x{size}"] = " ".join([lecture, korean] * size)
+    return corpora
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문장 분리기 처리량과 경계 일치도 비교")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100],
+                        help="합성 말뭉치 반복 횟수 (기본값: 10 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="측정 반복 횟수 (가장 빠른 값 사용)")
+    parser.add_argument("--reference", default="punkt", help="경계 일치도의 기준 분리기")
+    args = parser.parse_args()
+
+    segmenters = {}
+    for name in SEGMENTERS:
+        start = time.perf_counter()
+        try:
+            # 미리 받아 둔 Punkt 자료(text-preprocessing/nltk_data)를 먼저 찾는다
+            segmenters[name] = get_segmenter(name, os.path.join(os.path.dirname(current_dir), "nltk_data"))
+        except Exception as e:
+            print(f"{name} 분리기를 불러오지 못했습니다: {e}")
+            continue
+        print(f"{name} 분리기 준비 시간: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    reference = args.reference if args.reference in segmenters else None
+    if reference is None:
+        print(f"기준 분리기({args.reference})를 사용할 수 없어 경계 일치도는 생략합니다.")
+
+    print(f"\n{'말뭉치':<22} {'분리기':<8} {'크기(KB)':>9} {'문장 수':>8} {'MB/초':>9} {'문장/초':>11} {'F1':>6}")
+    for corpus_name, text in load_corpora(args.sizes).items():
+        reference_offsets = None
+        if reference:
+            reference_offsets = boundary_offsets(text, segmenters[reference].tokenize(text))
+        for name, segmenter in segmenters.items():
+            elapsed = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                sentences = segmenter.tokenize(text)
+                elapsed = min(elapsed, time.perf_counter() - start)
+            size_mb = len(text.encode('utf-8')) / 1024 / 1024
+            f1 = "-"
+            if reference_offsets is not None:
+                f1 = f"{agreement(reference_offsets, boundary_offsets(text, sentences))['f1']:.3f}"
+            print(f"{corpus_name:<22} {name:<8} {size_mb * 1024:>9.1f} {len(sentences):>8} "
+                  f"{size_mb / elapsed:>9.2f} {len(sentences) / elapsed:>11.0f} {f1:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+# text-preprocessing 폴더 경로
+current_dir = os.path.dirname(os.path.abspath(__file__))
+package_dir = os.path.dirname(current_dir)
+
+# main을 불러올 때 함께 불러오면 안 되는(처음 쓸 때 불러와야 하는) 모듈
+LAZY_MODULES = ("openai", "nltk", "tqdm", "dotenv", "tiktoken")
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    # 매번 새 프로세스에서 실행하되, 바이트코드 캐시는 사용해 실제 실행과 같은 조건으로 측정
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    return subprocess.run([sys.executable, *args, "-c", code], cwd=package_dir, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def profile_imports() -> Tuple[float, List[Tuple[str, float, float]]]:
+    """python -X importtime으로 main을 불러오는 시간(ms)과 모듈별 (이름, 자체 시간, 누적 시간)을 구합니다."""
+    stderr = run_python("import main", "-X", "importtime").stderr
+    modules = []
+    total = 0.0
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+        if name == "main" and not indent:
+            total = int(cumulative_us) / 1000
+    return total, modules
+
+
+def loaded_lazy_modules() -> List[str]:
+    code = f"import sys, main; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    return run_python(code).stdout.split()
+
+
+def time_split_only(files: int, segmenter: str) -> float:
+    """작은 파일 여러 개를 --split-only로 처리하는 명령 전체의 실행 시간(초)을 측정합니다."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_dir = os.path.join(work_dir, "inputs")
+        os.makedirs(input_dir)
+        for i in range(files):
+            with open(os.path.join(input_dir, f"small_{i:03d}.txt"), 'w', encoding='utf-8') as f:
+                f.write("Um, so today we talk about processes. A process is a program in execution. " * 3)
+        code = ("import contextlib, io, main\n"
+                f"main.Config.SEGMENTER = {segmenter!r}\n"
+                "with contextlib.redirect_stdout(io.StringIO()):\n"
+                f"    main.run_cli([{input_dir!r}], 1, True, {os.path.join(work_dir, 'out')!r})")
+        start = time.perf_counter()
+        run_python(code)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main.py 시작 시간 측정")
+    parser.add_argument("--top", type=int, default=10, help="자체 import 시간이 긴 모듈을 몇 개 보여줄지")
+    parser.add_argument("--files", type=int, default=20, help="--split-only로 처리할 작은 파일 수")
+    parser.add_argument("--segmenter", default="regex", help="문장 분리기 (punkt는 미리 받아 둔 자료 필요)")
+    args = parser.parse_args()
+
+    # 첫 실행에서 바이트코드 캐시를 만든다
+    run_python("import main")
+
+    total, modules = profile_imports()
+    print(f"main import 시간: {total:.1f}ms")
+    print(f"\n{'모듈':<40} {'자체(ms)':>9} {'누적(ms)':>9}")
+    for name, self_ms, cumulative_ms in sorted(modules, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40} {self_ms:>9.1f} {cumulative_ms:>9.1f}")
+
+    empty = time_split_only(0, args.segmenter) if args.files else None
+    elapsed = time_split_only(args.files, args.segmenter)
+    print(f"\n--split-only 작은 파일 {args.files}개: {elapsed * 1000:.0f}ms"
+          + (f" (파일 0개: {empty * 1000:.0f}ms)" if empty is not None else ""))
+
+    loaded = loaded_lazy_modules()
+    if loaded:
+        print(f"\nmain을 불러올 때 함께 불러온 무거운 모듈: {', '.join(loaded)}")
+        sys.exit(1)
+    print(f"\nmain을 불러올 때 {', '.join(LAZY_MODULES)}를 불러오지 않았습니다.")
+
+
+if __name__ == "__main__":
+    main()
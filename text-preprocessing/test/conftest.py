@@ -0,0 +1,7 @@
+import os
+import sys
+
+# text-preprocessing 폴더의 모듈을 불러오기 위한 경로 설정
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+sys.path.insert(0, current_dir)
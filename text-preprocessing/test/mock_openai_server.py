@@ -0,0 +1,382 @@
+import argparse
+import collections
+import email.parser
+import email.policy
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# text-preprocessing 폴더의 모듈을 불러오기 위한 경로 설정
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from tokenizer import estimate_tokens
+
+
+def count_tokens(text: str) -> int:
+    """대략적인 토큰 수를 계산합니다. 벤치마크의 토큰 효율과 단위가 같도록 tokenizer.estimate_tokens를 사용합니다."""
+    return estimate_tokens(text)
+
+
+def make_completion(request: dict, broken_json: bool = False) -> dict:
+    """사용자 메시지를 그대로 돌려주는 chat completion 응답을 만듭니다.
+    broken_json이면 JSON 응답을 요청한 경우 내용의 앞 절반만 돌려줍니다."""
+    messages = request.get("messages", [])
+    prompt = "".join(message.get("content", "") for message in messages)
+    content = messages[-1].get("content", "") if messages else ""
+    if broken_json and (request.get("response_format") or {}).get("type") == "json_object":
+        content = content[:len(content) // 2]
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": count_tokens(prompt),
+            "completion_tokens": count_tokens(content),
+            "total_tokens": count_tokens(prompt) + count_tokens(content)
+        }
+    }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """chat.completions 요청에 사용자 메시지를 그대로 돌려주는 가짜 OpenAI API"""
+
+    def log_message(self, format, *args):
+        # 요청마다 출력되는 로그 생략
+        pass
+
+    def send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def read_json(self) -> dict:
+        return json.loads(self.read_body() or b"{}")
+
+    def do_POST(self):
+        path = self.path.rstrip('/')
+        if path.endswith("/chat/completions"):
+            self.handle_chat_completion(self.read_json())
+        elif path.endswith("/files"):
+            self.handle_file_upload()
+        elif path.endswith("/batches"):
+            self.handle_batch_create(self.read_json())
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        parts = path.split('/')
+        if path.endswith("/batches"):
+            with self.server.lock:
+                batches = [self.server.batch_object(batch_id) for batch_id in reversed(list(self.server.batches))]
+            self.send_json(200, {"object": "list", "data": batches, "has_more": False})
+        elif len(parts) >= 2 and parts[-2] == "batches":
+            if parts[-1] not in self.server.batches:
+                self.send_json(404, {"error": {"message": f"No batch found with id '{parts[-1]}'"}})
+                return
+            with self.server.lock:
+                self.send_json(200, self.server.batch_object(parts[-1]))
+        elif len(parts) >= 3 and parts[-1] == "content" and parts[-3] == "files":
+            data = self.server.files.get(parts[-2], {}).get("content")
+            if data is None:
+                self.send_json(404, {"error": {"message": f"No file found with id '{parts[-2]}'"}})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+    def send_rate_limited(self, retry_after: float):
+        with self.server.lock:
+            self.server.error_count += 1
+        self.send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                       "code": "rate_limit_exceeded"}},
+                       headers={"retry-after": f"{retry_after:.3f}"})
+
+    def handle_chat_completion(self, request: dict):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            failing = server.request_count <= server.fail_first
+            # rpm_limit이 있으면 최근 60초 동안 받은 요청 수로 실제 API처럼 한도를 적용
+            retry_after = None
+            if server.rpm_limit:
+                now = time.monotonic()
+                while server.recent and server.recent[0] <= now - 60:
+                    server.recent.popleft()
+                if len(server.recent) >= server.rpm_limit:
+                    retry_after = server.recent[0] + 60 - now
+                else:
+                    server.recent.append(now)
+        if retry_after is not None:
+            self.send_rate_limited(retry_after)
+            return
+
+        if server.delay_for:
+            time.sleep(server.delay_for(request))
+        else:
+            time.sleep(max(0.0, server.latency + random.uniform(-server.latency_jitter, server.latency_jitter)))
+
+        # 처음 fail_first개 요청은 fail_status로 응답
+        if failing and server.fail_status != 429:
+            with server.lock:
+                server.error_count += 1
+            self.send_json(server.fail_status, {"error": {"message": f"Mock error {server.fail_status}",
+                                                          "type": "invalid_request_error"}})
+            return
+        # error_rate 확률로 429 응답 (Retry-After 헤더 포함)
+        if failing or random.random() < server.error_rate:
+            self.send_rate_limited(server.retry_after)
+            return
+
+        if request.get("stream"):
+            self.send_stream(request)
+            return
+        self.send_json(200, make_completion(request, server.broken_json))
+
+    def send_stream(self, request: dict):
+        """stream=True 요청에 응답을 단어 단위 chat.completion.chunk 이벤트(SSE)로 나누어 보냅니다."""
+        completion = make_completion(request)
+        content = completion["choices"][0]["message"]["content"]
+
+        def chunk(choices: list, usage: dict = None) -> bytes:
+            body = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                    "model": completion["model"], "choices": choices, "usage": usage}
+            return f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for piece in re.findall(r'\s*\S+', content) or [""]:
+            self.wfile.write(chunk([{"index": 0, "delta": {"role": "assistant", "content": piece},
+                                     "finish_reason": None}]))
+            self.wfile.flush()
+            time.sleep(self.server.token_latency)
+        self.wfile.write(chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(chunk([], completion["usage"]))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def handle_file_upload(self):
+        """multipart/form-data로 업로드된 파일을 메모리에 저장합니다."""
+        raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self.read_body()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(raw)
+        fields = {}
+        for part in message.iter_parts():
+            fields[part.get_param("name", header="content-disposition")] = part
+        upload = fields["file"]
+        file_id = f"file-mock-{uuid.uuid4().hex[:12]}"
+        file_object = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(upload.get_payload(decode=True)),
+            "created_at": int(time.time()),
+            "filename": upload.get_filename() or "upload.jsonl",
+            "purpose": fields["purpose"].get_content() if "purpose" in fields else "batch",
+            "status": "processed"
+        }
+        with self.server.lock:
+            self.server.files[file_id] = dict(file_object, content=upload.get_payload(decode=True))
+        self.send_json(200, file_object)
+
+    def handle_batch_create(self, request: dict):
+        """입력 파일의 요청을 모두 처리한 결과 파일을 만들고, batch_delay초 뒤에 batch_status 상태가 되는 배치를 생성합니다.
+        batch_error_rate 확률로 요청을 실패시켜 오류 파일에 기록하고, batch_status가 completed가 아니면 결과 파일 없이 끝납니다."""
+        server = self.server
+        input_file = server.files.get(request.get("input_file_id"))
+        if input_file is None:
+            self.send_json(400, {"error": {"message": "Invalid input_file_id"}})
+            return
+
+        lines = []
+        errors = []
+        for line in input_file["content"].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if random.random() < server.batch_error_rate:
+                errors.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": item["custom_id"],
+                    "response": {"status_code": 400, "request_id": uuid.uuid4().hex,
+                                 "body": {"error": {"message": "Mock batch request failed", "type": "invalid_request_error"}}},
+                    "error": None
+                }))
+                continue
+            lines.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": item["custom_id"],
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": make_completion(item["body"])},
+                "error": None
+            }, ensure_ascii=False))
+
+        batch_id = f"batch_mock_{uuid.uuid4().hex[:12]}"
+        completed = server.batch_status == "completed"
+        output_file_id = f"file-mock-{uuid.uuid4().hex[:12]}" if completed else None
+        error_file_id = f"file-mock-{uuid.uuid4().hex[:12]}" if completed and errors else None
+        with server.lock:
+            if output_file_id:
+                server.files[output_file_id] = {"id": output_file_id, "content": ("\n".join(lines) + "\n").encode('utf-8')}
+            if error_file_id:
+                server.files[error_file_id] = {"id": error_file_id, "content": ("\n".join(errors) + "\n").encode('utf-8')}
+            server.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": request.get("endpoint"),
+                "input_file_id": request["input_file_id"],
+                "completion_window": request.get("completion_window", "24h"),
+                "created_at": int(time.time()),
+                "metadata": request.get("metadata"),
+                "output_file_id": output_file_id,
+                "error_file_id": error_file_id,
+                "request_counts": {"total": len(lines) + len(errors), "completed": len(lines) if completed else 0,
+                                   "failed": len(errors)},
+                "ready_at": time.time() + server.batch_delay
+            }
+            self.send_json(200, server.batch_object(batch_id))
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 요청을 취소해 연결이 끊긴 경우는 무시
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockOpenAIServer:
+    """테스트용 가짜 OpenAI API 서버
+
+    latency(± latency_jitter)초 뒤에 응답하고, error_rate 확률로 429를 돌려줍니다.
+    stream=True 요청에는 단어마다 token_latency초 간격으로 SSE 이벤트를 보냅니다.
+    rpm_limit을 지정하면 최근 60초 동안의 요청 수가 한도를 넘을 때 남은 시간을 Retry-After로 알려주는 429를 돌려줍니다.
+    테스트에서는 delay_for(요청 본문으로 지연 시간을 정하는 함수), fail_first(처음 몇 개 요청을 fail_status로 실패),
+    broken_json(JSON 응답을 요청하면 잘린 내용을 돌려줌)으로 응답 순서와 오류를 정할 수 있습니다.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 1.0, batch_delay: float = 0.0,
+                 latency_jitter: float = 0.0, rpm_limit: int = 0, token_latency: float = 0.0,
+                 batch_status: str = "completed", batch_error_rate: float = 0.0,
+                 delay_for: Optional[Callable[[dict], float]] = None, fail_first: int = 0, fail_status: int = 429,
+                 broken_json: bool = False):
+        self.httpd = MockHTTPServer((host, port), MockOpenAIHandler)
+        self.httpd.latency = latency
+        self.httpd.latency_jitter = latency_jitter
+        self.httpd.token_latency = token_latency
+        self.httpd.error_rate = error_rate
+        self.httpd.retry_after = retry_after
+        self.httpd.rpm_limit = rpm_limit
+        self.httpd.delay_for = delay_for
+        self.httpd.fail_first = fail_first
+        self.httpd.fail_status = fail_status
+        self.httpd.broken_json = broken_json
+        self.httpd.recent = collections.deque()
+        self.httpd.request_count = 0
+        self.httpd.error_count = 0
+        self.httpd.lock = threading.Lock()
+        # 가짜 Batch API 저장소
+        self.httpd.batch_delay = batch_delay
+        self.httpd.batch_status = batch_status
+        self.httpd.batch_error_rate = batch_error_rate
+        self.httpd.files = {}
+        self.httpd.batches = {}
+        self.httpd.batch_object = self.batch_object
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def error_count(self) -> int:
+        return self.httpd.error_count
+
+    def batch_object(self, batch_id: str) -> dict:
+        """ready_at 이전에는 in_progress, 이후에는 batch_status 상태의 배치 객체를 반환합니다."""
+        batch = dict(self.httpd.batches[batch_id])
+        ready = time.time() >= batch.pop("ready_at")
+        batch["status"] = self.httpd.batch_status if ready else "in_progress"
+        if not ready:
+            batch["output_file_id"] = None
+            batch["error_file_id"] = None
+        return batch
+
+    def start(self) -> str:
+        """백그라운드 스레드에서 서버를 시작하고 base_url을 반환합니다."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="테스트용 가짜 OpenAI API 서버")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="응답 지연 시간 (초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="응답 지연 시간의 무작위 편차 (초)")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="스트리밍 응답의 단어 사이 간격 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429를 돌려줄 확률 (0~1)")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="분당 최대 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--batch-status", default="completed",
+                        help="배치가 끝났을 때의 상태 (completed 외에는 결과 파일 없이 끝남: failed, expired, cancelled)")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="배치 요청을 실패시켜 오류 파일에 기록할 확률 (0~1)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+                              error_rate=args.error_rate, rpm_limit=args.rpm_limit, token_latency=args.token_latency,
+                              batch_status=args.batch_status, batch_error_rate=args.batch_error_rate)
+    print(f"Mock OpenAI 서버 실행 중: {server.base_url}")
+    print("main.py 실행 시 OPENAI_BASE_URL 환경 변수를 위 주소로 설정하세요. (종료: Ctrl+C)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n서버를 종료합니다.")
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import pytest
+from openai import OpenAI
+
+from batch_job import BatchJob
+from mock_openai_server import MockOpenAIServer
+
+FILES = {"a.txt": ["The first chunk.", "The second chunk."], "b.txt": ["The third chunk."]}
+
+
+def open_job(server: MockOpenAIServer, work_dir: str) -> BatchJob:
+    client = OpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+    return BatchJob(client, work_dir, "mock-model", 0.0, "Refine.")
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_unfinished_batch_is_resubmitted(tmp_path, status):
+    with MockOpenAIServer(batch_status=status) as server:
+        job = open_job(server, str(tmp_path))
+        job.prepare(FILES, {"1-0": "cached third"})
+        job.submit()
+        with pytest.raises(RuntimeError, match=status):
+            job.wait(0.01)
+        assert (job.state["status"], job.state["batch_status"]) == ("failed", status)
+
+        # 다음 실행: 끝난 배치를 다시 기다리지 않고 결과가 없는 청크만 새 배치로 제출
+        server.httpd.batch_status = "completed"
+        resumed = open_job(server, str(tmp_path))
+        assert resumed.has_pending() and resumed.state["status"] == "failed"
+        assert resumed.retry_failed() == 2
+        resumed.submit()
+        assert resumed.state["batch_id"] != job.state["batch_id"]
+        resumed.wait(0.01)
+        collected = resumed.collect()
+    assert collected["a.txt"]["texts"] == FILES["a.txt"] and collected["a.txt"]["rejected"] == []
+    assert collected["b.txt"]["texts"] == ["cached third"]
+
+
+def test_completed_batch_is_not_polled_again(tmp_path):
+    with MockOpenAIServer() as server:
+        job = open_job(server, str(tmp_path))
+        job.prepare(FILES)
+        job.submit()
+        job.wait(0.01)
+        server.stop()
+        # 서버가 없어도 완료 상태를 읽어 바로 결과를 모은다
+        resumed = open_job(server, str(tmp_path))
+        resumed.wait(0.01)
+    assert resumed.collect()["b.txt"]["texts"] == FILES["b.txt"]
+
+
+def test_request_errors_come_from_error_file(tmp_path):
+    with MockOpenAIServer(batch_error_rate=1.0) as server:
+        job = open_job(server, str(tmp_path))
+        job.prepare(FILES)
+        job.submit()
+        job.wait(0.01)
+        collected = job.collect()
+    assert job.state["error_file_id"]
+    assert collected["a.txt"]["texts"] == FILES["a.txt"] and collected["a.txt"]["rejected"] == [0, 1]
+    assert collected["a.txt"]["errors"] == {0: "Mock batch request failed", 1: "Mock batch request failed"}
+
+
+def test_cli_reports_cache_lookups(tmp_path, monkeypatch, capsys):
+    from main import Config, TextProcessor, process_file, run_batch_job
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "lecture.txt").write_text("The first sentence is long enough. The second sentence is long enough.",
+                                        encoding="utf-8")
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    for name, value in {"ASSETS_DIR": str(assets), "DATA_DIR": str(tmp_path / "data"), "SEGMENTER": "regex",
+                        "BATCH_JOB_DIR": str(tmp_path / "batch"), "CACHE_PATH": str(tmp_path / "cache.sqlite3"),
+                        "MAX_SENTENCE_LENGTH": 40}.items():
+        monkeypatch.setattr(Config, name, value)
+    chunks = process_file(str(assets / "lecture.txt"))
+    assert len(chunks) == 2
+    processor = TextProcessor()
+    processor.cache.put(processor.cache_key(chunks[0]), "cached first")
+    processor.cache.close()
+
+    with MockOpenAIServer() as server:
+        monkeypatch.setattr(Config, "OPENAI_BASE_URL", server.base_url)
+        run_batch_job(0.01)
+    assert "캐시 적중 1회 / 미적중 1회" in capsys.readouterr().out
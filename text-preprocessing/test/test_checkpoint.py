@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+from checkpoint import CheckpointJournal
+from main import Config, TextProcessor
+from mock_openai_server import MockOpenAIServer
+
+CHUNKS = ["The first chunk is about processes.", "The second chunk is about threads.",
+          "The third chunk is about scheduling."]
+
+
+def test_resume_returns_recorded_output(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    journal = CheckpointJournal(path)
+    journal.record(0, CHUNKS[0], "refined first")
+    journal.record(1, CHUNKS[1], "refined second")
+    journal.close()
+
+    resumed = CheckpointJournal(path)
+    assert resumed.get(0, CHUNKS[0]) == "refined first"
+    assert resumed.get(1, CHUNKS[1]) == "refined second"
+    # 번호나 입력이 다르면 이어서 쓰지 않는다
+    assert resumed.get(1, CHUNKS[2]) is None
+    assert resumed.get(2, CHUNKS[2]) is None
+    resumed.complete()
+    assert not os.path.exists(path)
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    journal = CheckpointJournal(path)
+    journal.record(0, CHUNKS[0], "refined first")
+    journal.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"index": 1, "input_hash": "ab')
+
+    resumed = CheckpointJournal(path)
+    assert resumed.get(0, CHUNKS[0]) == "refined first"
+    assert resumed.get(1, CHUNKS[1]) is None
+    # 잘린 줄 뒤에 이어 쓴 기록도 다음 실행에서 읽힌다
+    resumed.record(1, CHUNKS[1], "refined second")
+    resumed.close()
+    journal = CheckpointJournal(path)
+    assert journal.get(1, CHUNKS[1]) == "refined second"
+    journal.close()
+
+
+def test_processor_requests_only_unfinished_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CACHE_ENABLED", False)
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    path = str(tmp_path / "run.jsonl")
+    journal = CheckpointJournal(path)
+    journal.record(1, CHUNKS[1], "refined second")
+    journal.close()
+
+    with MockOpenAIServer() as server:
+        monkeypatch.setattr(Config, "OPENAI_BASE_URL", server.base_url)
+        journal = CheckpointJournal(path)
+        results = asyncio.run(TextProcessor().process_sentences_async(CHUNKS, journal=journal))
+        journal.close()
+        assert server.request_count == 2
+    assert [result.resumed for result in results] == [False, True, False]
+    assert results[1].text == "refined second"
+    # 이번 실행에서 끝난 청크도 기록되어 다음 실행에서는 요청하지 않는다
+    journal = CheckpointJournal(path)
+    assert [journal.get(index, chunk) is not None for index, chunk in enumerate(CHUNKS)] == [True, True, True]
+    journal.close()
@@ -0,0 +1,54 @@
+import pytest
+
+from chunk_store import ChunkStore, ChunkStoreWriter, locate_spans
+from refine_engine import RefineResult
+
+SOURCE = ("Um, so today we talk about processes.\n\nA process is a program in execution.  "
+          "Hi.   The scheduler picks the next process to run.\n")
+# 문장을 공백 하나로 이어 붙이고 짧은 문장("Hi.")은 뺀 청크
+CHUNKS = ["Um, so today we talk about processes. A process is a program in execution.",
+          "The scheduler picks the next process to run."]
+
+
+def test_locate_spans():
+    spans = locate_spans(SOURCE, CHUNKS)
+    assert SOURCE[spans[0][0]:spans[0][1]] == "Um, so today we talk about processes.\n\nA process is a program in execution."
+    assert SOURCE[spans[1][0]:spans[1][1]] == CHUNKS[1]
+    assert locate_spans(SOURCE, ["Not in the source at all."]) == [(None, None)]
+
+
+def write_store(path: str, count: int):
+    with ChunkStoreWriter(path, "missing-source.txt", "mock-model") as writer:
+        for index in range(count):
+            writer.write(f"chunk {index}", RefineResult(index, f"refined {index}", model="mock-model"))
+
+
+def test_random_access(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    write_store(path, 50)
+    with ChunkStore(path) as store:
+        assert len(store) == 50
+        assert store.get(37)["refined"] == "refined 37"
+        assert store.get(0)["index"] == 0
+        assert store.header["model"] == "mock-model"
+        with pytest.raises(IndexError):
+            store.get(50)
+
+
+def test_export_text(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    write_store(path, 3)
+    with ChunkStore(path) as store:
+        assert store.export_text() == "refined 0\n    refined 1\n    refined 2"
+        assert [record["refined"] for record in store] == ["refined 0", "refined 1", "refined 2"]
+
+
+def test_interrupted_write_keeps_previous_store(tmp_path):
+    path = str(tmp_path / "store.jsonl")
+    write_store(path, 2)
+    with pytest.raises(RuntimeError):
+        with ChunkStoreWriter(path, "missing-source.txt", "mock-model") as writer:
+            writer.write("chunk 0", RefineResult(0, "new 0"))
+            raise RuntimeError("중단")
+    with ChunkStore(path) as store:
+        assert store.export_text() == "refined 0\n    refined 1"
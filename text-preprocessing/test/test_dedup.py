@@ -0,0 +1,36 @@
+from dedup import DedupIndex, LSHIndex, MinHasher, trivial_difference
+
+CHUNK = ("In this course we will cover the basics of operating systems, starting with processes and threads. "
+         "We have two goals for today: first, understand how the scheduler picks the next process to run, "
+         "and second, see how context switching saves and restores the state of a process. "
+         "After that we will look at a few scheduling algorithms such as round robin and shortest job first, "
+         "and compare their behaviour on interactive and batch workloads. Please read chapter three before "
+         "next week so that we can go straight into the exercises about synchronization and locks.")
+
+
+def test_trivial_difference():
+    assert trivial_difference(CHUNK, CHUNK.replace("We have", "Um, we have"))
+    assert not trivial_difference(CHUNK, CHUNK.replace("two goals", "six goals"))
+    assert not trivial_difference(CHUNK, CHUNK.replace("chapter three", "chapter 3"))
+
+
+def test_dedup_index_rejects_changed_number(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), "context", threshold=0.9)
+    index.add(CHUNK, "refined two goals")
+    edited = CHUNK.replace("two goals", "six goals")
+    assert index.hasher.shingles(edited) and index.find(edited) is None
+    assert index.find(CHUNK.replace("We have", "So we have"))[0] == "refined two goals"
+    index.close()
+
+
+def test_dedup_index_separates_contexts(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    DedupIndex(path, "model-a").add(CHUNK, "refined")
+    assert DedupIndex(path, "model-b").find(CHUNK) is None
+
+
+def test_local_index_rejects_changed_name():
+    index = LSHIndex(MinHasher(), threshold=0.9)
+    index.add(0, CHUNK)
+    assert index.query(CHUNK.replace("round robin", "round robin, uh,"))[0] == 0
+    assert index.query(CHUNK.replace("round robin", "lottery")) is None
@@ -0,0 +1,52 @@
+import os
+
+from incremental import RunManifest
+from main import Config, SentenceSplitter
+
+LECTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                       "assets", "lecture1.txt")
+
+CHUNKS = ["chunk a", "chunk b", "chunk c", "chunk d"]
+
+
+def saved_manifest(tmp_path, refined=None) -> RunManifest:
+    manifest = RunManifest(str(tmp_path / "run.json"))
+    manifest.save(CHUNKS, refined or [f"refined {chunk}" for chunk in CHUNKS])
+    return RunManifest(str(tmp_path / "run.json"))
+
+
+def test_align_counts(tmp_path):
+    manifest = saved_manifest(tmp_path)
+    reused, stats = manifest.align(["chunk a", "chunk B", "chunk c", "chunk d", "chunk e"])
+    assert stats == {"unchanged": 3, "changed": 1, "inserted": 1, "deleted": 0}
+    assert reused == {0: "refined chunk a", 2: "refined chunk c", 3: "refined chunk d"}
+
+    reused, stats = manifest.align(["chunk a", "chunk d"])
+    assert stats == {"unchanged": 2, "changed": 0, "inserted": 0, "deleted": 2}
+    assert reused == {0: "refined chunk a", 1: "refined chunk d"}
+
+
+def test_failed_chunks_are_not_reused(tmp_path):
+    manifest = saved_manifest(tmp_path, ["refined a", None, "refined c", "refined d"])
+    reused, stats = manifest.align(CHUNKS)
+    assert stats["unchanged"] == 4
+    assert sorted(reused) == [0, 2, 3]
+
+
+def test_edit_reuses_chunks_after_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SEGMENTER", "regex")
+    monkeypatch.setattr(Config, "PACKING_MODE", "stable")
+    splitter = SentenceSplitter()
+    with open(LECTURE, 'r', encoding='utf-8') as f:
+        sentences = splitter.tokenize(f.read())
+    chunks = splitter.process_sentences(sentences)
+    manifest = RunManifest(str(tmp_path / "run.json"))
+    manifest.save(chunks, [f"refined {i}" for i in range(len(chunks))])
+
+    # 앞부분에 긴 문장을 넣어도 뒤쪽 청크 경계는 그대로라 넣은 곳 주변만 다시 요청한다
+    sentences.insert(2, "Before we start, please make sure you can hear me, and if not, raise your hand so that "
+                        "the teaching assistant can fix the microphone settings.")
+    edited = splitter.process_sentences(sentences)
+    reused, stats = manifest.align(edited)
+    assert len(edited) - len(reused) <= 2
+    assert stats["unchanged"] == len(reused) >= len(chunks) - 2
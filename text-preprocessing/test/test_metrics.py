@@ -0,0 +1,34 @@
+import json
+
+from metrics import LatencySample, MetricsRecorder
+from refine_engine import RefineResult
+
+
+def results(count: int):
+    for index in range(count):
+        if index % 3 == 0:
+            yield RefineResult(index, "cached", cached=True, tier="default")
+        else:
+            yield RefineResult(index, "refined", input_tokens=40, output_tokens=30, attempts=1 + index % 2,
+                               cost=0.001, model="model", tier="default", latency=index / 100)
+
+
+def test_streaming_totals_match_records():
+    kept, streamed = MetricsRecorder(1000.0), MetricsRecorder(1000.0, keep_records=False)
+    for recorder in (kept, streamed):
+        recorder.record("a.txt", results(30))
+        recorder.record("b.txt", results(10))
+    assert streamed.records == []
+    assert streamed.total() == kept.total() == kept.summarize(kept.records)
+    assert streamed.by_file() == kept.by_file()
+    assert streamed.total()["sources"] == {"api": 26, "cache": 14, "dedup": 0, "prefilter": 0, "resumed": 0}
+    assert "requests" not in json.loads(streamed.to_json())
+
+
+def test_latency_sample_is_bounded():
+    sample = LatencySample(max_size=100)
+    for value in range(10000):
+        sample.add(value / 10000)
+    assert len(sample.values) == 100
+    assert (sample.count, sample.max) == (10000, 0.9999)
+    assert 0.3 < sample.percentile(0.5) < 0.7
@@ -0,0 +1,41 @@
+import pytest
+
+from main import Config, SentenceSplitter
+from pipeline import stream_chunks, stream_sentences
+from segmenter import RegexSegmenter
+
+TEXT = ("A process is a program in execution. The scheduler picks the next process to run! "
+        "Context switching saves the state of a process? Threads share the address space. ") * 20
+
+
+# 문장마다 내용이 달라 "stable" 모드의 앵커 위치가 고르지 않은 입력
+NOTES = " ".join(f"Lecture note {i} covers topic {i * 7 % 13} in detail." for i in range(300))
+
+
+def blocks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_blocks_match_whole_text():
+    tokenize = RegexSegmenter().tokenize
+    for size in (7, 64, 1000):
+        assert list(stream_sentences(blocks(TEXT, size), tokenize, 600)) == tokenize(TEXT)
+
+
+def test_unpunctuated_text_is_split_at_whitespace():
+    text = "so the packet goes to the router and then " * 500
+    sentences = list(stream_sentences(blocks(text, 256), RegexSegmenter().tokenize, 100))
+    assert max(len(sentence) for sentence in sentences) <= 100
+    assert " ".join(sentences).split() == text.split()
+
+
+@pytest.mark.parametrize("mode", ["chars", "stable"])
+def test_stream_chunks_match_whole_file(monkeypatch, mode):
+    monkeypatch.setattr(Config, "SEGMENTER", "regex")
+    monkeypatch.setattr(Config, "PACKING_MODE", mode)
+    monkeypatch.setattr(Config, "MAX_SENTENCE_LENGTH", 200)
+    splitter = SentenceSplitter()
+    sentences = splitter.tokenize(NOTES)
+    for window in (3, 8, 64):
+        assert list(stream_chunks(iter(sentences), splitter.group_sentences, window)) == \
+            splitter.process_sentences(sentences)
@@ -0,0 +1,49 @@
+import pytest
+
+from prefilter import FillerFilter
+
+
+@pytest.fixture
+def prefilter():
+    return FillerFilter()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Um, so, today we talk about the the kernel.", "Today we talk about the kernel."),
+    ("Um. So today, uh... we start.", "So today, we start."),
+    ("Hmm, the heap, erm, grows upward. Mmm.", "The heap, grows upward."),
+    ("The sched.. scheduler picks one.", "The scheduler picks one."),
+    ("프로.. 프로세스는 음… 그 그 프로그램입니다.", "프로세스는 그 프로그램입니다."),
+    ("It is, I mean, simple.", "It is, simple."),
+])
+def test_removes_fillers(prefilter, text, expected):
+    assert prefilter.clean(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 숫자 반복과 말더듬은 값이 바뀔 수 있으므로 남긴다
+    ("The sequence is 1, 1, 2, 3, 5, 8.", "The sequence is 1, 1, 2, 3, 5, 8."),
+    ("There are 2 2-bit registers.", "There are 2 2-bit registers."),
+    ("Do you know, the 5... 5 layers?", "Do you know, the 5 5 layers?"),
+    # 쉼표로 나뉜 반복과 문법상 두 번 쓰는 단어
+    ("He said so, so we agree.", "He said so, so we agree."),
+    ("He had had enough.", "He had had enough."),
+    ("I know that that works.", "I know that that works."),
+    # 하이픈으로 이어진 단어와 문장 끝 마침표
+    ("Mm-hmm, right.", "Mm-hmm, right."),
+    ("And then ah.", "And then."),
+    # 단위와 대문자 약어는 간투사가 아니다
+    ("The wire is 5 mm thick.", "The wire is 5 mm thick."),
+    ("It is 10 mm. Next.", "It is 10 mm. Next."),
+    ("Wait 3 hmm seconds.", "Wait 3 hmm seconds."),
+    ("He was taken to the ER.", "He was taken to the ER."),
+    ("We use an HMM here.", "We use an HMM here."),
+    ("UM stands for unified memory.", "UM stands for unified memory."),
+])
+def test_preserves_meaning(prefilter, text, expected):
+    assert prefilter.clean(text) == expected
+
+
+def test_needs_refinement(prefilter):
+    assert prefilter.needs_refinement("It is, like, actually kind of simple.")
+    assert not prefilter.needs_refinement("The scheduler picks the next process.")
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from openai import AsyncOpenAI
+
+from mock_openai_server import MockOpenAIServer
+from refine_engine import AsyncRefineEngine
+from scheduler import RateLimiter, RequestScheduler
+
+SENTENCES = ["The first chunk is slow.", "The second chunk is fast.", "The third chunk is in between."]
+DELAYS = {SENTENCES[0]: 0.3, SENTENCES[1]: 0.0, SENTENCES[2]: 0.1}
+
+
+def run_engine(server: MockOpenAIServer, work, timeout: float = 5.0, max_retries: int = 0, **engine_options):
+    """Mock 서버를 쓰는 엔진을 만들어 work(engine)을 실행합니다."""
+    async def main():
+        async with AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0) as client:
+            scheduler = RequestScheduler(RateLimiter(), max_retries=max_retries, base_delay=0.01, timeout=timeout)
+            engine = AsyncRefineEngine(client, scheduler, "mock-model", 0.0, "Refine.", **engine_options)
+            return await work(engine)
+    return asyncio.run(main())
+
+
+def test_results_keep_input_order():
+    completed = []
+    with MockOpenAIServer(delay_for=lambda request: DELAYS[request["messages"][-1]["content"]]) as server:
+        results = run_engine(server, lambda engine: engine.refine_all(
+            SENTENCES, on_result=lambda result: completed.append(result.index)))
+    assert completed == [1, 2, 0]
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.text for result in results] == SENTENCES
+
+
+def test_timeout_keeps_original():
+    with MockOpenAIServer(latency=0.5) as server:
+        results = run_engine(server, lambda engine: engine.refine_all(SENTENCES[:1]), timeout=0.1, max_retries=1)
+    assert results[0].rejected and results[0].error == "요청 시간 초과"
+    assert results[0].text == SENTENCES[0]
+    assert results[0].attempts == 2
+
+
+@pytest.mark.parametrize("content", [
+    '{"chunks": [{"id": 1, "text": "b"}, {"id": 0, "text": "a"}]}',
+    '{"chunks": [{"id": 0, "text": "a"}, {"id": 2, "text": "b"}]}',
+    '{"chunks": [{"id": 0, "text": "a"}]}',
+    '{"chunks": [{"id": 0, "text": "a"}, {"id": 1, "text": " "}]}',
+    '{"chunks": [{"id": 0, "text": "a"}',
+])
+def test_batch_response_must_match_request(content):
+    assert AsyncRefineEngine.parse_batch_response(content, [0, 1]) is None
+
+
+def test_batch_response_in_order():
+    content = '{"chunks": [{"id": 0, "text": " a "}, {"id": 1, "text": "b"}]}'
+    assert AsyncRefineEngine.parse_batch_response(content, [0, 1]) == ["a", "b"]
+
+
+def test_batch_falls_back_to_single_requests():
+    with MockOpenAIServer(broken_json=True) as server:
+        results = run_engine(server, lambda engine: engine.refine_all(SENTENCES), batch_size=8)
+        assert server.request_count == 1 + len(SENTENCES)
+    assert [result.text for result in results] == SENTENCES
+    assert not any(result.rejected for result in results)
+    # 깨진 묶음 응답에 쓴 토큰은 첫 결과에 더해 둔다
+    assert results[0].input_tokens > results[1].input_tokens
+
+
+def test_batch_sends_one_request():
+    with MockOpenAIServer() as server:
+        results = run_engine(server, lambda engine: engine.refine_all(SENTENCES), batch_size=8)
+        assert server.request_count == 1
+    assert [result.text for result in results] == SENTENCES
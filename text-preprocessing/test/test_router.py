@@ -0,0 +1,46 @@
+from prefilter import FillerFilter
+from router import ModelRouter
+
+TIERS = {
+    "small": {"model": "small-model", "max_score": 0.05},
+    "large": {"model": "large-model", "max_score": None},
+}
+CLEAN = ("The transport layer provides logical communication between processes running on different hosts, "
+         "while the network layer provides logical communication between the hosts themselves.")
+MESSY = ("Um, so, the transport layer, uh, like, it actually kind of provides, you know, um, logical "
+         "communication, like, between processes, uh, literally running on, um, different hosts, right?")
+
+
+def test_all_chunks_reach_a_model_by_default():
+    router = ModelRouter(TIERS, FillerFilter(), short_chunk_words=5)
+    for text in (CLEAN, "Um, " + CLEAN, MESSY):
+        assert router.route(text).model is not None
+
+
+def test_local_tiers_are_opt_in():
+    router = ModelRouter(TIERS, FillerFilter(), short_chunk_words=5, allow_local=True)
+    assert router.route(CLEAN).tier == "skip"
+    assert router.route(CLEAN).text == CLEAN
+    route = router.route("Um, " + CLEAN)
+    assert (route.tier, route.model) == ("local", None)
+    assert route.text == CLEAN
+
+
+def test_residual_markers_go_to_a_model():
+    router = ModelRouter(TIERS, FillerFilter(), short_chunk_words=5, allow_local=True)
+    for text in ("So the transport layer basically provides logical communication between processes.",
+                 "The transport layer provides, I guess, like, logical communication between processes."):
+        assert router.route(text).model is not None
+
+
+def test_score_picks_tier():
+    router = ModelRouter(TIERS, FillerFilter(), short_chunk_words=5)
+    assert router.route(CLEAN).tier == "small"
+    assert router.route(MESSY).tier == "large"
+    # 짧은 청크는 점수와 관계없이 가장 싼 단계
+    assert ModelRouter(TIERS, FillerFilter(), short_chunk_words=100).route(MESSY).tier == "small"
+
+
+def test_without_prefilter_text_is_sent_unchanged():
+    route = ModelRouter(TIERS).route(MESSY)
+    assert route.text == MESSY and route.model is not None
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+from openai import AsyncOpenAI
+
+from mock_openai_server import MockOpenAIServer
+from scheduler import RateLimiter, RequestRejectedError, RequestScheduler
+
+
+def submit(server: MockOpenAIServer, max_retries: int = 3):
+    """Mock 서버에 요청 하나를 스케줄러로 보내고 (응답, 시도 횟수)를 반환합니다."""
+    async def main():
+        async with AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0) as client:
+            # base_delay가 0이면 백오프 없이 Retry-After만큼 기다린다
+            scheduler = RequestScheduler(RateLimiter(), max_retries=max_retries, base_delay=0.0, timeout=5.0)
+            return await scheduler.submit(lambda: client.chat.completions.create(
+                model="mock-model", messages=[{"role": "user", "content": "hello"}]), 10)
+    return asyncio.run(main())
+
+
+def test_retry_after_is_honoured():
+    with MockOpenAIServer(fail_first=1, retry_after=0.3) as server:
+        start = time.perf_counter()
+        response, attempts = submit(server)
+        elapsed = time.perf_counter() - start
+        assert (attempts, server.request_count, server.error_count) == (2, 2, 1)
+    assert response.choices[0].message.content == "hello"
+    assert elapsed >= 0.3
+
+
+def test_rejected_after_retries():
+    with MockOpenAIServer(error_rate=1.0, retry_after=0.01) as server:
+        with pytest.raises(RequestRejectedError) as error:
+            submit(server, max_retries=2)
+        assert server.request_count == 3
+    assert error.value.attempts == 3
+    assert "RateLimitError" in str(error.value)
+
+
+def test_client_errors_are_not_retried():
+    with MockOpenAIServer(fail_first=1, fail_status=400) as server:
+        with pytest.raises(RequestRejectedError) as error:
+            submit(server)
+        assert server.request_count == 1
+    assert error.value.attempts == 1
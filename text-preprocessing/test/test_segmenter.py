@@ -0,0 +1,44 @@
+import nltk
+import pytest
+
+import segmenter
+from segmenter import RegexSegmenter, Segmenter, available_segmenter
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("스레드도 배워요 알겠죠", ["스레드도 배워요", "알겠죠"]),
+    ("이 그림을 봐요 그러면 이해가 돼요 다음 예제를 줘요 그리고 끝입니다",
+     ["이 그림을 봐요", "그러면 이해가 돼요", "다음 예제를 줘요", "그리고 끝입니다"]),
+    ("제가 설명할게요 자료는 각자 가져요", ["제가 설명할게요", "자료는 각자 가져요"]),
+    ("프로세스가 필요합니다. 오늘은 운영체제를 공부해요 다음 시간에는 메모리를 다룹니다",
+     ["프로세스가 필요합니다.", "오늘은 운영체제를 공부해요", "다음 시간에는 메모리를 다룹니다"]),
+])
+def test_korean_endings(text, expected):
+    assert RegexSegmenter().tokenize(text) == expected
+
+
+def test_nouns_ending_in_yo_are_not_boundaries():
+    text = "따로 설치할 필요 없이 주요 개념의 개요 위주로 봅니다"
+    assert RegexSegmenter().tokenize(text) == [text]
+
+
+def test_segmenter_requires_tokenize():
+    with pytest.raises(TypeError):
+        Segmenter()
+
+
+def test_missing_punkt_falls_back_without_network(tmp_path, monkeypatch, capsys):
+    def download(*args, **kwargs):
+        raise AssertionError("실행 중에는 내려받지 않아야 합니다")
+
+    monkeypatch.setattr(nltk, "download", download)
+    monkeypatch.setattr(segmenter, "punkt_available", lambda data_dir=None: False)
+    available_segmenter.cache_clear()
+    try:
+        assert available_segmenter("punkt", str(tmp_path)) == "regex"
+        assert available_segmenter("punkt", str(tmp_path)) == "regex"
+    finally:
+        available_segmenter.cache_clear()
+    # 경고는 프로세스당 한 번만
+    assert capsys.readouterr().out.count("경고") == 1
+    assert not any(tmp_path.iterdir())
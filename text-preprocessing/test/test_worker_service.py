@@ -0,0 +1,115 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from worker_service import Job, ServiceClient, WorkerService, WorkerServiceHandler, parse_job_request
+
+
+class StubService:
+    """API를 호출하지 않고 제출된 작업만 기록하는 WorkerService 대역"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.submitted = []
+
+    def submit(self, name, text=None, path=None):
+        self.submitted.append((name, text, path))
+        job = Job(name, [text or path])
+        self.jobs[job.id] = job
+        return job
+
+    def stats(self):
+        return {"queue_depth": sum(len(job.pending) for job in self.jobs.values())}
+
+    def to_prometheus(self):
+        return "refine_service_queue_depth 0\n"
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), WorkerServiceHandler)
+    httpd.service = StubService()
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(httpd, method, path, body=None):
+    url = f"http://127.0.0.1:{httpd.server_address[1]}{path}"
+    data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method)) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.mark.parametrize("body", [b"[1]", b"not json", b"{}", {"text": 5}, {"text": "   "},
+                                  {"text": "a", "path": "b"}, {"path": "/no/such/file.txt"},
+                                  {"text": "a", "name": 3}])
+def test_invalid_job_is_rejected(server, body):
+    status, data = request(server, "POST", "/jobs", body)
+    assert status == 400
+    assert "error" in json.loads(data)
+    assert server.service.submitted == []
+
+
+def test_submit_text_and_path(server, tmp_path):
+    status, data = request(server, "POST", "/jobs", {"text": "Um, hello there."})
+    assert status == 202 and json.loads(data)["name"] == "text"
+    source = tmp_path / "lecture.txt"
+    source.write_text("Hello.", encoding="utf-8")
+    status, data = request(server, "POST", "/jobs", {"path": str(source), "name": "lecture"})
+    assert status == 202
+    assert server.service.submitted[-1] == ("lecture", None, str(source))
+    status, data = request(server, "GET", f"/jobs/{json.loads(data)['id']}")
+    assert status == 200 and json.loads(data)["status"] == "queued"
+
+
+def test_get_endpoints(server):
+    request(server, "POST", "/jobs", {"text": "Hello."})
+    assert json.loads(request(server, "GET", "/stats")[1]) == {"queue_depth": 1}
+    assert len(json.loads(request(server, "GET", "/jobs")[1])["jobs"]) == 1
+    assert request(server, "GET", "/metrics")[1].startswith(b"refine_service_queue_depth")
+    assert request(server, "GET", "/jobs/unknown")[0] == 404
+    assert request(server, "POST", "/other", {"text": "a"})[0] == 404
+
+
+def test_parse_job_request_defaults_name(tmp_path):
+    source = tmp_path / "lecture.txt"
+    source.write_text("Hello.", encoding="utf-8")
+    assert parse_job_request(json.dumps({"path": str(source)}).encode()) == ("lecture.txt", None, str(source))
+    assert parse_job_request(b'{"text": "Hi."}') == ("text", "Hi.", None)
+
+
+def test_save_error_fails_job():
+    class BrokenFileManager:
+        def save_refined(self, source_path, chunks, results):
+            raise ValueError("잘못된 결과")
+
+    job = Job("lecture", ["chunk"], "lecture.txt")
+
+    async def main():
+        service = SimpleNamespace(loop=asyncio.get_running_loop(), file_manager=BrokenFileManager())
+        await WorkerService.finish(service, job)
+
+    asyncio.run(main())
+    assert job.status == "failed"
+    assert "ValueError" in job.error
+
+
+def test_wait_times_out(server):
+    client = ServiceClient(f"http://127.0.0.1:{server.server_address[1]}")
+    job = client.submit(text="Hello.")
+    # 스텁 서비스의 작업은 끝나지 않는다
+    with pytest.raises(TimeoutError):
+        client.wait(job["id"], poll_interval=0.01, timeout=0.1)
@@ -0,0 +1,28 @@
+def estimate_tokens(text: str) -> int:
+    """로컬에서 대략적인 토큰 수를 추정합니다. (ASCII 4자당 1토큰, 그 외 문자는 1자당 1토큰)"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+class TokenCounter:
+    """모델의 토크나이저로 토큰 수를 계산합니다. tiktoken이 없으면 추정값을 사용합니다."""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        # tiktoken은 불러오는 데 오래 걸리므로 토큰 기준 병합을 쓸 때만 가져온다
+        try:
+            import tiktoken
+        except ImportError:
+            return
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # 인코딩 파일을 내려받지 못한 경우 추정값 사용
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return estimate_tokens(text)
+        return len(self.encoding.encode(text))
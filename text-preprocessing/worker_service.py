@@ -0,0 +1,403 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+
+from main import Config, FileManager, TextProcessor, collect_input_files, get_splitter, split_file
+from refine_engine import RefineResult
+from segmenter import available_segmenter
+
+
+def split_text(text: str) -> List[str]:
+    """프로세스 풀에서 실행됩니다. 텍스트를 문장 분리하고 병합한 청크 목록을 반환합니다."""
+    return get_splitter().split_sentences(text)
+
+
+class Job:
+    """서비스에 제출된 파일 또는 텍스트 하나의 정제 작업"""
+
+    def __init__(self, name: str, chunks: List[str], source_path: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.chunks = chunks
+        self.source_path = source_path
+        self.results: List[Optional[RefineResult]] = [None] * len(chunks)
+        self.pending: Deque[int] = deque(range(len(chunks)))
+        self.done = 0
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.saved_path: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished is not None:
+            return "failed" if self.error else "done"
+        return "running" if self.done or len(self.pending) < len(self.chunks) else "queued"
+
+    def to_dict(self, include_text: bool = False) -> dict:
+        completed = [result for result in self.results if result is not None]
+        info = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "chunks": len(self.chunks),
+            "done": self.done,
+            "pending": len(self.pending),
+            "rejected": sum(result.rejected for result in completed),
+            "cost_usd": sum(result.cost for result in completed),
+            "elapsed": (self.finished or time.time()) - self.created,
+            "saved_path": self.saved_path,
+            "error": self.error
+        }
+        if include_text and self.finished is not None:
+            info["text"] = "\n    ".join(result.text for result in self.results)
+        return info
+
+
+class WorkerService:
+    """여러 사용자의 정제 작업을 한 프로세스에서 받아 처리하는 서비스
+
+    모든 작업이 하나의 TextProcessor(캐시, 유사 청크 색인, 분당 한도, 지표)와 하나의 API 클라이언트
+    (연결 풀, 동시 요청 수 제한)를 함께 쓰므로, 여러 프로세스가 각자 요청해 한도를 나눠 먹지 않습니다.
+    문장 분리는 프로세스 풀에서 병렬로 하고, 청크는 작업마다 돌아가며 하나씩 보내 큰 작업이 먼저 들어와도
+    나중에 들어온 작업이 함께 진행됩니다. API 요청은 이벤트 루프 스레드 하나에서 처리합니다.
+    """
+
+    def __init__(self, processor: Optional[TextProcessor] = None, file_manager: Optional[FileManager] = None,
+                 max_in_flight: Optional[int] = None, split_workers: Optional[int] = None,
+                 job_retention: float = 3600.0, throughput_window: float = 60.0):
+        self.processor = processor or TextProcessor()
+        self.file_manager = file_manager or FileManager()
+        self.max_in_flight = max_in_flight or Config.MAX_CONCURRENT_REQUESTS
+        self.job_retention = job_retention
+        self.throughput_window = throughput_window
+        available_segmenter(Config.SEGMENTER, Config.NLTK_DATA_DIR)
+        self.split_pool = ProcessPoolExecutor(max_workers=split_workers)
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        # 처리할 청크가 남은 작업 (돌아가며 하나씩 꺼냄)
+        self.rotation: Deque[Job] = deque()
+        self.in_flight = 0
+        self.completed: Deque[float] = deque()
+        self.completed_total = 0
+        self.started = time.time()
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.split_pool.shutdown()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.open_engine())
+        self.dispatcher = self.loop.create_task(self.dispatch())
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.dispatcher.cancel()
+            self.loop.run_until_complete(self.client.close())
+            self.loop.close()
+
+    async def open_engine(self):
+        # 클라이언트와 엔진은 이벤트 루프에 묶이므로 루프 스레드에서 한 번만 만든다
+        self.client = self.processor.create_client()
+        self.engine = self.processor.create_engine(self.client)
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.wakeup = asyncio.Event()
+
+    def submit(self, name: str, text: Optional[str] = None, path: Optional[str] = None) -> Job:
+        """텍스트나 파일 경로를 문장 분리해 작업으로 등록합니다. 여러 스레드에서 동시에 호출할 수 있습니다."""
+        if path is not None:
+            chunks, _ = self.split_pool.submit(split_file, path).result()
+        else:
+            chunks = self.split_pool.submit(split_text, text or "").result()
+        job = Job(name, chunks, path)
+        with self.lock:
+            self.remove_expired()
+            self.jobs[job.id] = job
+        self.loop.call_soon_threadsafe(self.enqueue, job)
+        return job
+
+    def remove_expired(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished is not None and now - job.finished > self.job_retention:
+                del self.jobs[job_id]
+
+    def enqueue(self, job: Job):
+        if job.chunks:
+            self.rotation.append(job)
+            self.wakeup.set()
+        else:
+            self.loop.create_task(self.finish(job))
+
+    def next_job(self) -> Optional[Job]:
+        """처리할 청크가 남은 작업을 돌아가며 고릅니다."""
+        while self.rotation:
+            job = self.rotation.popleft()
+            if job.pending:
+                self.rotation.append(job)
+                return job
+        return None
+
+    async def dispatch(self):
+        while True:
+            await self.slots.acquire()
+            job = self.next_job()
+            while job is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                job = self.next_job()
+            index = job.pending.popleft()
+            self.in_flight += 1
+            self.loop.create_task(self.run_chunk(job, index))
+
+    async def run_chunk(self, job: Job, index: int):
+        try:
+            results = await self.processor.process_sentences_async(
+                [job.chunks[index]], engine=self.engine, start_index=index, source=job.name,
+                context=job.chunks[index - 1] if index else None
+            )
+            job.results[index] = results[0]
+        except Exception as e:
+            job.results[index] = RefineResult(index, job.chunks[index], error=f"{type(e).__name__}: {e}")
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+        now = time.monotonic()
+        self.completed.append(now)
+        while self.completed[0] < now - self.throughput_window:
+            self.completed.popleft()
+        self.completed_total += 1
+        job.done += 1
+        if job.done == len(job.chunks):
+            await self.finish(job)
+
+    async def finish(self, job: Job):
+        if job.source_path:
+            try:
+                # 파일 쓰기는 이벤트 루프를 막지 않도록 스레드에서 실행
+                job.saved_path = await self.loop.run_in_executor(
+                    None, self.file_manager.save_refined, job.source_path, job.chunks, job.results)
+            except Exception as e:
+                # 어떤 오류든 작업을 실패로 끝내야 기다리는 클라이언트가 멈추지 않는다
+                job.error = f"결과를 저장하지 못했습니다: {type(e).__name__}: {e}"
+        job.finished = time.time()
+
+    def stats(self) -> dict:
+        """대기 중인 청크 수, 진행 중인 요청 수, 처리량, 작업 상태별 개수, 누적 비용"""
+        cutoff = time.monotonic() - self.throughput_window
+        recent = sum(1 for finished in list(self.completed) if finished >= cutoff)
+        with self.lock:
+            jobs = list(self.jobs.values())
+        statuses: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in jobs:
+            statuses[job.status] += 1
+        total = self.processor.metrics.total()
+        return {
+            "queue_depth": sum(len(job.pending) for job in jobs),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "jobs": statuses,
+            "completed_chunks": self.completed_total,
+            "throughput_per_second": recent / self.throughput_window,
+            "uptime": time.time() - self.started,
+            "cost_usd": total["cost_usd"],
+            "sources": total["sources"]
+        }
+
+    def to_prometheus(self) -> str:
+        stats = self.stats()
+        lines = [
+            "# HELP refine_service_queue_depth Chunks waiting to be sent.",
+            "# TYPE refine_service_queue_depth gauge",
+            f"refine_service_queue_depth {stats['queue_depth']}",
+            "# HELP refine_service_in_flight Chunks being refined.",
+            "# TYPE refine_service_in_flight gauge",
+            f"refine_service_in_flight {stats['in_flight']}",
+            "# HELP refine_service_throughput_chunks_per_second Chunks completed per second over the recent window.",
+            "# TYPE refine_service_throughput_chunks_per_second gauge",
+            f"refine_service_throughput_chunks_per_second {stats['throughput_per_second']:.4f}",
+            "# HELP refine_service_jobs Jobs by status.",
+            "# TYPE refine_service_jobs gauge",
+        ]
+        lines += [f'refine_service_jobs{{status="{status}"}} {count}' for status, count in stats["jobs"].items()]
+        return "\n".join(lines) + "\n" + self.processor.metrics.to_prometheus()
+
+
+def parse_job_request(body: bytes) -> Tuple[str, Optional[str], Optional[str]]:
+    """POST /jobs 본문을 검사하고 (작업 이름, 텍스트, 파일 경로)를 반환합니다. 잘못된 요청이면 ValueError를 발생시킵니다."""
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise ValueError("요청 본문이 JSON이 아닙니다") from None
+    if not isinstance(request, dict):
+        raise ValueError("요청 본문은 JSON 객체여야 합니다")
+    text, path, name = request.get("text"), request.get("path"), request.get("name")
+    if (text is None) == (path is None):
+        raise ValueError("text와 path 중 하나가 필요합니다")
+    if text is not None and (not isinstance(text, str) or not text.strip()):
+        raise ValueError("text는 비어 있지 않은 문자열이어야 합니다")
+    if path is not None and (not isinstance(path, str) or not os.path.isfile(path)):
+        raise ValueError(f"파일이 없습니다: {path}")
+    if name is not None and not isinstance(name, str):
+        raise ValueError("name은 문자열이어야 합니다")
+    return name or (os.path.basename(path) if path else "text"), text, path
+
+
+class WorkerServiceHandler(BaseHTTPRequestHandler):
+    """POST /jobs, GET /jobs, GET /jobs/<id>, GET /stats, GET /metrics"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != "/jobs":
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            name, text, path = parse_job_request(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            job = self.server.service.submit(name, text=text, path=path)
+        except (ValueError, OSError) as e:
+            # 잘못된 요청이나 읽을 수 없는 파일(인코딩 오류 포함)은 처리 스레드를 죽이지 않고 400으로 알린다
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(202, job.to_dict())
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        if path == "/stats":
+            self.send_json(200, service.stats())
+        elif path == "/metrics":
+            data = service.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif path == "/jobs":
+            with service.lock:
+                jobs = [job.to_dict() for job in service.jobs.values()]
+            self.send_json(200, {"jobs": jobs})
+        elif path.startswith("/jobs/"):
+            job = service.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                self.send_json(404, {"error": f"작업이 없습니다: {path}"})
+                return
+            self.send_json(200, job.to_dict(include_text=True))
+        else:
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+
+
+class ServiceClient:
+    """실행 중인 WorkerService에 작업을 제출하고 완료를 기다립니다."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def submit(self, text: Optional[str] = None, path: Optional[str] = None, name: Optional[str] = None) -> dict:
+        body = {"name": name}
+        if path is not None:
+            # 서비스는 같은 호스트에서 실행되므로 절대 경로로 보낸다
+            body["path"] = os.path.abspath(path)
+        else:
+            body["text"] = text
+        return self.request("POST", "/jobs", body)
+
+    def job(self, job_id: str) -> dict:
+        return self.request("GET", f"/jobs/{job_id}")
+
+    def stats(self) -> dict:
+        return self.request("GET", "/stats")
+
+    def wait(self, job_id: str, poll_interval: float = 0.5, timeout: Optional[float] = None) -> dict:
+        """작업이 끝날 때까지 기다립니다. timeout초 안에 끝나지 않으면 TimeoutError를 발생시킵니다."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.job(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"작업이 {timeout:.0f}초 안에 끝나지 않았습니다: {job['name']} "
+                                   f"({job['done']}/{job['chunks']}개 청크 완료)")
+            time.sleep(poll_interval)
+
+
+def serve(host: str, port: int, split_workers: Optional[int] = None):
+    """서비스를 실행하고 Ctrl+C를 누를 때까지 요청을 받습니다."""
+    service = WorkerService(split_workers=split_workers, job_retention=Config.SERVICE_JOB_RETENTION,
+                            throughput_window=Config.SERVICE_THROUGHPUT_WINDOW)
+    service.start()
+    httpd = ThreadingHTTPServer((host, port), WorkerServiceHandler)
+    httpd.service = service
+    print(f"정제 서비스 실행 중: http://{host}:{httpd.server_address[1]} (종료: Ctrl+C)")
+    if service.processor.routing_summary():
+        print(service.processor.routing_summary())
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n서비스를 종료합니다.")
+    finally:
+        httpd.server_close()
+        service.stop()
+
+
+def run_service_cli(url: str, inputs: List[str], poll_interval: float = 0.5,
+                    timeout: Optional[float] = None) -> int:
+    """파일을 서비스에 제출하고 모두 끝날 때까지 기다립니다. 처리하지 못한 청크가 있거나
+    작업이 실패 또는 timeout초(파일마다) 안에 끝나지 않으면 1을 반환합니다."""
+    paths = collect_input_files(inputs)
+    if not paths:
+        print(f"처리할 txt 파일이 없습니다: {' '.join(inputs)}")
+        return 1
+    client = ServiceClient(url)
+    submitted = [client.submit(path=path) for path in paths]
+    print(f"{len(submitted)}개 파일을 제출했습니다. 대기 중인 청크: {client.stats()['queue_depth']}개")
+    rejected_total = 0
+    failed = 0
+    for job in submitted:
+        try:
+            job = client.wait(job["id"], poll_interval, timeout)
+        except TimeoutError as e:
+            print(e)
+            failed += 1
+            continue
+        rejected_total += job["rejected"]
+        failed += job["status"] == "failed"
+        print(f"{job['name']:<30} {job['chunks']:>6}개 청크 {job['elapsed']:>8.2f}초 실패 {job['rejected']:>3} "
+              f"${job['cost_usd']:.4f}  -> {job['saved_path'] or job['error']}")
+    stats = client.stats()
+    print(f"서비스 처리량: {stats['throughput_per_second']:.1f} 청크/초, 누적 비용 ${stats['cost_usd']:.4f}")
+    return 1 if rejected_total or failed else 0